@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Profile, Lesson, Test, Question, Attempt
+from django.contrib import admin, messages
+from .models import Profile, Lesson, Test, Question, Attempt, OutboundEmail, Task
+from . import grading, leaderboard, review, tasks
 from django import forms
 
 class TestAdminForm(forms.ModelForm):
@@ -12,6 +13,17 @@ class TestAdminForm(forms.ModelForm):
 
 class TestAdmin(admin.ModelAdmin):
     form = TestAdminForm
+    actions = ['regrade']
+
+    @admin.action(description='إعادة تصحيح المحاولات بعد تعديل الإجابات الصحيحة')
+    def regrade(self, request, queryset):
+        for test in queryset:
+            tasks.enqueue(tasks.regrade_test, test.id)
+        self.message_user(
+            request,
+            f'تمت جدولة إعادة التصحيح لـ {queryset.count()} اختبار، ستظهر النتائج بعد انتهاء المهام الخلفية',
+            messages.SUCCESS,
+        )
 
 admin.site.register(Profile)
 admin.site.register(Lesson)
@@ -27,25 +39,31 @@ class AttemptAdmin(admin.ModelAdmin):
         # obj هو كائن Attempt
         # التحقق مما إذا تم تغيير حقل الإجابات
         if 'answers' in form.changed_data:
-            new_score = 0
-            questions = Question.objects.filter(test=obj.test)
-            student_answers = obj.answers or {}
-
-            for question in questions:
-                question_id_str = str(question.id)
-                student_answer = student_answers.get(question_id_str)
-
-                if student_answer is not None:
-                    try:
-                        # مقارنة الإجابة بالإجابة الصحيحة
-                        if int(student_answer) == int(question.correct_answer):
-                            new_score += 1
-                    except (ValueError, TypeError):
-                        # تجاهل الإجابات غير الصالحة
-                        pass
-            
-            obj.score = new_score
-        
+            key = grading.answer_key(obj.test_id)
+            obj.score = grading.grade(obj.answers, key)
+            if review.is_current(obj.review_snapshot):
+                review.apply_answers(obj.review_snapshot, obj.answers)
+            elif obj.completed:
+                obj.review_snapshot = review.legacy_snapshot(obj, key)
+
         super().save_model(request, obj, form, change)
+        leaderboard.record(obj)
 
 admin.site.register(Attempt, AttemptAdmin)
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'updated_at')
+
+admin.site.register(Task, TaskAdmin)
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'to', 'subject', 'status', 'attempts', 'run_after', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('to', 'subject')
+    readonly_fields = ('created_at', 'updated_at', 'sent_at')
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
@@ -0,0 +1,124 @@
+"""
+Per-question analytics built from ``Attempt.answers``.
+
+``record_attempt`` folds one completed attempt into the ``TestStat`` /
+``QuestionStat`` summary rows; ``rebuild_test_stats`` recomputes them from
+scratch by streaming the attempts of a test in chunks.  The admin report
+only reads the summary rows.
+
+Both run in a transaction that starts by locking the test's ``TestStat``
+row, so they never interleave, and ``Attempt.stats_recorded`` marks what
+the rows already include: a ``record_attempt`` still queued when a rebuild
+ran (e.g. right after a regrade) finds its attempt counted and does
+nothing, and an attempt completed during a rebuild is added by its own
+``record_attempt`` afterwards.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import grading
+from .models import Attempt, QuestionStat, TestStat
+
+STATS_CHUNK_SIZE = 2000
+_QUESTION_FIELDS = [
+    'responses', 'correct', 'unanswered', 'choice_counts',
+    'score_sum', 'score_sq_sum', 'correct_score_sum',
+]
+
+
+def _as_choice(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _accumulate(stat, chosen, correct, total):
+    stat.responses += 1
+    stat.score_sum += total
+    stat.score_sq_sum += total * total
+    if chosen <= 0:
+        stat.unanswered += 1
+    else:
+        counts = stat.choice_counts
+        counts[str(chosen)] = counts.get(str(chosen), 0) + 1
+    if chosen == correct:
+        stat.correct += 1
+        stat.correct_score_sum += total
+
+
+def _lock_test_stat(test_id):
+    TestStat.objects.get_or_create(test_id=test_id)
+    # كتابة على الصف: قفل صف في PostgreSQL وقفل الكتابة في SQLite، قبل أي قراءة للمحاولات
+    TestStat.objects.select_for_update().filter(test_id=test_id).update(updated_at=timezone.now())
+
+
+def record_attempt(attempt_id):
+    """Add one completed attempt to its test's summary rows."""
+    attempt = (
+        Attempt.objects.filter(pk=attempt_id, completed=True)
+        .only('id', 'test_id', 'score', 'answers')
+        .first()
+    )
+    if attempt is None:
+        return None
+    key = grading.answer_key(attempt.test_id)
+    answers = {qid: _as_choice(v) for qid, v in (attempt.answers or {}).items() if qid in key}
+    total = attempt.score
+
+    with transaction.atomic():
+        _lock_test_stat(attempt.test_id)
+        if not Attempt.objects.filter(pk=attempt.pk, stats_recorded=False).update(stats_recorded=True):
+            # أضافها rebuild_test_stats بالفعل
+            return None
+        TestStat.objects.filter(test_id=attempt.test_id).update(
+            attempts=F('attempts') + 1,
+            score_sum=F('score_sum') + total,
+            score_sq_sum=F('score_sq_sum') + total * total,
+        )
+
+        question_ids = [int(qid) for qid in answers]
+        QuestionStat.objects.bulk_create(
+            [QuestionStat(question_id=qid) for qid in question_ids],
+            ignore_conflicts=True,
+        )
+        stats = list(QuestionStat.objects.select_for_update().filter(question_id__in=question_ids))
+        for stat in stats:
+            qid = str(stat.question_id)
+            _accumulate(stat, answers[qid], key[qid], total)
+        QuestionStat.objects.bulk_update(stats, _QUESTION_FIELDS)
+    return {'questions': len(stats)}
+
+
+def rebuild_test_stats(test_id, chunk_size=STATS_CHUNK_SIZE):
+    """Recompute the summary rows of a test from all its completed attempts."""
+    key = grading.answer_key(test_id)
+    test_stat = TestStat(test_id=test_id)
+    stats = {qid: QuestionStat(question_id=int(qid)) for qid in key}
+
+    with transaction.atomic():
+        _lock_test_stat(test_id)
+        # نعلّم أولاً ثم نقرأ المعلَّم فقط: ما يكتمل بعد هذا السطر تضيفه مهمته record_attempt
+        Attempt.objects.filter(test_id=test_id, completed=True, stats_recorded=False).update(stats_recorded=True)
+        attempts = (
+            Attempt.objects.filter(test_id=test_id, completed=True, stats_recorded=True)
+            .values_list('score', 'answers')
+            .order_by()
+        )
+        for total, answers in attempts.iterator(chunk_size=chunk_size):
+            test_stat.attempts += 1
+            test_stat.score_sum += total
+            test_stat.score_sq_sum += total * total
+            for qid, chosen in (answers or {}).items():
+                if qid in stats:
+                    _accumulate(stats[qid], _as_choice(chosen), key[qid], total)
+
+        TestStat.objects.filter(test_id=test_id).update(
+            attempts=test_stat.attempts,
+            score_sum=test_stat.score_sum,
+            score_sq_sum=test_stat.score_sq_sum,
+        )
+        QuestionStat.objects.filter(question__test_id=test_id).delete()
+        QuestionStat.objects.bulk_create(stats.values())
+    return {'attempts': test_stat.attempts, 'questions': len(stats)}
@@ -0,0 +1,404 @@
+"""
+Versioned JSON API for the mobile app (``/api/v1/``).
+
+Everything a student does in the HTML pages, in compact JSON:
+
+* ``?fields=id,title`` returns only the listed fields (sparse fieldsets);
+  unknown field names are a 400 so typos do not silently return nothing.
+* Every GET carries an ``ETag``; a client that sends it back in
+  ``If-None-Match`` gets an empty ``304`` when nothing changed.
+* Lists are cursor-paginated by primary key: ``?limit=`` (at most
+  ``API_MAX_LIMIT``) and the opaque ``next`` cursor from the previous page,
+  so paging stays cheap and stable while rows are added.
+
+Authentication is the normal Django session: ``GET auth/csrf/`` for a token,
+then ``POST auth/login/`` with ``X-CSRFToken``.  Hidden lessons and admin
+rights follow the same rules as the HTML views (``roles.is_admin``), and
+submissions go through ``attempts.submit`` like ``take_test``.
+"""
+import base64
+import hashlib
+import json
+from functools import wraps
+
+from django.contrib.auth import authenticate, login, logout
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.csrf import ensure_csrf_cookie
+
+from . import attempts, gradebook, grading, leaderboard, papers, review
+from .models import Attempt, Lesson, LessonProgress, Test
+from .ratelimit import ratelimit
+from .roles import is_admin
+
+API_DEFAULT_LIMIT = 20
+API_MAX_LIMIT = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _dumps(data):
+    # بدون مسافات، والنص العربي كما هو (\uXXXX تضاعف حجمه)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), cls=DjangoJSONEncoder)
+
+
+def _error(status, message):
+    return HttpResponse(_dumps({'error': message}), status=status, content_type='application/json')
+
+
+def respond(request, data, status=200):
+    body = _dumps(data).encode()
+    if request.method == 'GET' and status == 200:
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        # الرد خاص بالمستخدم، والمتصفح/التطبيق يتحقق منه بالـ ETag قبل إعادة استخدامه
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+    return HttpResponse(body, status=status, content_type='application/json')
+
+
+def api_view(methods=('GET',), login_required=True):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return _error(405, 'method not allowed')
+            if login_required and not request.user.is_authenticated:
+                return _error(401, 'authentication required')
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as e:
+                return _error(e.status, e.message)
+            except Http404:
+                return _error(404, 'not found')
+        return wrapper
+    return decorator
+
+
+def body(request):
+    """The JSON request body as a dict (form-encoded bodies are accepted too)."""
+    if not hasattr(request, '_api_body'):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                raise ApiError(400, 'invalid JSON')
+            if not isinstance(data, dict):
+                raise ApiError(400, 'expected a JSON object')
+        else:
+            data = request.POST.dict()
+        request._api_body = data
+    return request._api_body
+
+
+def _body_username(request):
+    try:
+        return body(request).get('username', '')
+    except ApiError:
+        return ''
+
+
+def fields(request, allowed, default=None):
+    """Field names requested with ``?fields=``, checked against ``allowed``."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default or allowed)
+    wanted = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in wanted if f not in allowed]
+    if unknown:
+        raise ApiError(400, f"unknown field(s): {', '.join(unknown)}")
+    return wanted
+
+
+def sparse(item, names):
+    return {name: item[name] for name in names}
+
+
+def _encode_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ApiError(400, 'invalid cursor')
+
+
+def paginate(request, queryset):
+    """Return ``(rows, next_cursor)`` for keyset pagination on ``pk``."""
+    try:
+        limit = min(max(int(request.GET.get('limit', API_DEFAULT_LIMIT)), 1), API_MAX_LIMIT)
+    except ValueError:
+        raise ApiError(400, 'invalid limit')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(pk__gt=_decode_cursor(cursor))
+    rows = list(queryset.order_by('pk')[:limit + 1])
+    if len(rows) > limit:
+        return rows[:limit], _encode_cursor(rows[limit - 1].pk)
+    return rows, None
+
+
+def _visible_lessons(user):
+    lessons = Lesson.objects.all()
+    if not is_admin(user):
+        lessons = lessons.filter(is_hidden=False)
+    return lessons
+
+
+def _visible_tests(user):
+    tests = Test.objects.all()
+    if not is_admin(user):
+        tests = tests.filter(lesson__is_hidden=False)
+    return tests
+
+
+# --- Auth ---
+
+@api_view(login_required=False)
+@ensure_csrf_cookie
+def csrf(request):
+    return respond(request, {'csrf': get_token(request)})
+
+
+@api_view(methods=('POST',), login_required=False)
+@ratelimit('login', key_func=_body_username)
+def auth_login(request):
+    data = body(request)
+    user = authenticate(request, username=data.get('username', ''), password=data.get('password', ''))
+    if user is None:
+        raise ApiError(400, 'invalid username or password')
+    login(request, user)
+    # تسجيل الدخول يغيّر رمز CSRF
+    return respond(request, {'user': _me(user), 'csrf': get_token(request)})
+
+
+@api_view(methods=('POST',))
+def auth_logout(request):
+    logout(request)
+    return HttpResponse(status=204)
+
+
+# --- Lessons ---
+
+LESSON_FIELDS = ('id', 'title', 'type', 'created_at', 'video', 'pdf_pages', 'test', 'progress', 'content')
+LESSON_LIST_FIELDS = ('id', 'title', 'type', 'test', 'progress')
+
+
+def _lesson_queryset(user):
+    return _visible_lessons(user).annotate(
+        page_count=Count('pdf_pages'),
+        test_id=Subquery(Test.objects.filter(lesson=OuterRef('pk')).order_by('id').values('id')[:1]),
+        watched_percent=Subquery(
+            LessonProgress.objects.filter(lesson=OuterRef('pk'), user=user).values('percent')[:1]
+        ),
+    )
+
+
+def _lesson_item(lesson):
+    return {
+        'id': lesson.id,
+        'title': lesson.title,
+        'type': lesson.lesson_type,
+        'created_at': lesson.created_at,
+        'video': reverse('stream_video', args=[lesson.id]) if lesson.video_file else None,
+        'pdf_pages': lesson.page_count,
+        'test': lesson.test_id,
+        'progress': lesson.watched_percent or 0,
+        'content': lesson.content,
+    }
+
+
+@api_view()
+def lesson_list(request):
+    names = fields(request, LESSON_FIELDS, LESSON_LIST_FIELDS)
+    rows, next_cursor = paginate(request, _lesson_queryset(request.user))
+    return respond(request, {
+        'results': [sparse(_lesson_item(lesson), names) for lesson in rows],
+        'next': next_cursor,
+    })
+
+
+@api_view()
+def lesson_detail(request, pk):
+    names = fields(request, LESSON_FIELDS)
+    lesson = get_object_or_404(_lesson_queryset(request.user), pk=pk)
+    return respond(request, sparse(_lesson_item(lesson), names))
+
+
+# --- Tests ---
+
+TEST_FIELDS = ('id', 'title', 'lesson', 'time_limit', 'time_unit', 'questions', 'page_size', 'status', 'score')
+TEST_LIST_FIELDS = ('id', 'title', 'lesson', 'questions', 'status', 'score')
+
+
+def _test_items(tests, user):
+    mine = {
+        test_id: (completed, score)
+        for test_id, completed, score in Attempt.objects.filter(
+            user=user, test_id__in=[t.id for t in tests],
+        ).values_list('test_id', 'completed', 'score')
+    }
+    items = []
+    for test in tests:
+        completed, score = mine.get(test.id, (None, None))
+        items.append({
+            'id': test.id,
+            'title': test.title,
+            'lesson': test.lesson_id,
+            'time_limit': test.time_limit,
+            'time_unit': test.time_unit,
+            'questions': gradebook.paper_size(test),
+            'page_size': test.page_size,
+            'status': 'new' if completed is None else ('completed' if completed else 'started'),
+            'score': score if completed else None,
+        })
+    return items
+
+
+@api_view()
+def test_list(request):
+    names = fields(request, TEST_FIELDS, TEST_LIST_FIELDS)
+    tests = _visible_tests(request.user)
+    lesson = request.GET.get('lesson')
+    if lesson:
+        if not lesson.isdigit():
+            raise ApiError(400, 'invalid lesson')
+        tests = tests.filter(lesson_id=int(lesson))
+    rows, next_cursor = paginate(request, tests)
+    return respond(request, {
+        'results': [sparse(item, names) for item in _test_items(rows, request.user)],
+        'next': next_cursor,
+    })
+
+
+def _result(attempt):
+    standing = leaderboard.standing(attempt)
+    return {
+        'attempt': attempt.id,
+        'test': attempt.test_id,
+        'score': attempt.score,
+        'questions': len(attempt.answers or {}),
+        'completed_at': attempt.completed_at,
+        'rank': standing and standing['rank'],
+        'of': standing and standing['total'],
+        'percentile': standing and standing['percentile'],
+        'review': attempt.review_enabled,
+    }
+
+
+@api_view(methods=('GET', 'POST'))
+def test_paper(request, pk):
+    """GET: start (or resume) the attempt and return the paper.  POST: save draft answers."""
+    test = get_object_or_404(_visible_tests(request.user), pk=pk)
+    attempt = attempts.start(request.user, test)
+    if attempt.completed:
+        raise ApiError(409, 'test already submitted')
+    paper = papers.paper_for(attempt, test)
+
+    if request.method == 'POST':
+        answers = body(request).get('answers')
+        if not isinstance(answers, dict):
+            raise ApiError(400, 'expected "answers": {question_id: choice}')
+        attempt.answers = papers.collect_answers(paper, answers, previous=attempt.answers)
+        attempt.save(update_fields=['answers'])
+        return respond(request, {'answered': sum(1 for v in attempt.answers.values() if v)})
+
+    return respond(request, {
+        'attempt': attempt.id,
+        'time_limit': test.time_limit,
+        'time_unit': test.time_unit,
+        'questions': [
+            {'id': q['id'], 'text': q['text'], 'image': q['image'], 'choices': q['choices']}
+            for q in paper
+        ],
+        'answers': attempt.answers or {},
+    })
+
+
+@api_view(methods=('POST',))
+def test_submit(request, pk):
+    test = get_object_or_404(_visible_tests(request.user), pk=pk)
+    attempt = attempts.start(request.user, test)
+    if attempt.completed:
+        raise ApiError(409, 'test already submitted')
+    answers = body(request).get('answers', {})
+    if not isinstance(answers, dict):
+        raise ApiError(400, 'expected "answers": {question_id: choice}')
+    paper = papers.paper_for(attempt, test)
+    attempts.submit(attempt, test, paper, answers, request.user)
+    return respond(request, _result(attempt), status=201)
+
+
+# --- Attempts ---
+
+RESULT_FIELDS = ('attempt', 'test', 'score', 'questions', 'completed_at', 'rank', 'of', 'percentile', 'review',
+                 'answers')
+RESULT_DEFAULT_FIELDS = RESULT_FIELDS[:-1]
+
+
+@api_view()
+def attempt_detail(request, pk):
+    """Result of a completed attempt; ``?fields=...,answers`` adds the review rows."""
+    names = fields(request, RESULT_FIELDS, RESULT_DEFAULT_FIELDS)
+    attempt = get_object_or_404(
+        Attempt.objects.select_related('test'), pk=pk, user=request.user, completed=True,
+    )
+    item = _result(attempt)
+    if 'answers' in names:
+        if attempt.test.prevent_review and not attempt.review_enabled:
+            raise ApiError(403, 'review is not allowed for this test')
+        snapshot = attempt.review_snapshot
+        if not review.is_current(snapshot):
+            snapshot = review.legacy_snapshot(attempt, grading.answer_key(attempt.test_id))
+            attempt.review_snapshot = snapshot
+            attempt.save(update_fields=['review_snapshot'])
+        item['answers'] = [
+            {'text': row['text'], 'image': row['image_url'], 'chosen': row['chosen_text'],
+             'correct': row['correct_text'], 'is_correct': row['is_correct']}
+            for row in review.rows(snapshot)
+        ]
+    return respond(request, sparse(item, names))
+
+
+# --- Profile ---
+
+def _me(user):
+    totals = Attempt.objects.filter(user=user, completed=True).aggregate(
+        attempts=Count('id'), score=Sum('score'),
+    )
+    watch = LessonProgress.objects.filter(user=user).aggregate(
+        seconds=Sum('watched_seconds'), completed=Count('id', filter=Q(completed=True)),
+    )
+    return {
+        'id': user.id,
+        'username': user.username,
+        'name': user.get_full_name(),
+        'admin': is_admin(user),
+        'attempts': totals['attempts'],
+        'total_score': totals['score'] or 0,
+        'lessons_watched': watch['completed'],
+        'watch_minutes': round((watch['seconds'] or 0) / 60),
+    }
+
+
+@api_view()
+def me(request):
+    names = fields(request, ('id', 'username', 'name', 'admin', 'attempts', 'total_score',
+                             'lessons_watched', 'watch_minutes'))
+    return respond(request, sparse(_me(request.user), names))
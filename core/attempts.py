@@ -0,0 +1,58 @@
+"""
+Starting and submitting an exam attempt.
+
+Shared by the HTML exam pages (``views.take_test``) and the JSON API, so
+both grade, snapshot, rank and publish submissions the same way.
+"""
+from django.utils import timezone
+
+from . import events, grading, leaderboard, notifications, papers, review, tasks
+from .models import Attempt
+
+
+def monitor_data(attempt, user):
+    return {
+        'attempt_id': attempt.id,
+        'username': user.username,
+        'name': user.first_name or user.username,
+        'at': timezone.now().isoformat(),
+    }
+
+
+def start(user, test):
+    """Return the user's attempt at ``test``, created (with a paper seed) if needed."""
+    attempt, created = Attempt.objects.get_or_create(user=user, test=test)
+    if attempt.completed:
+        return attempt
+    if created:
+        events.publish(test.id, 'started', **monitor_data(attempt, user))
+
+    if not attempt.seed:
+        attempt.seed = papers.new_seed()
+        # الأسئلة المسحوبة تُثبت الآن، فتعديل بنك الأسئلة أثناء الاختبار لا يغيّرها
+        attempt.question_ids = papers.draw_questions(test, attempt.seed)
+        attempt.save(update_fields=['seed', 'question_ids'])
+    return attempt
+
+
+def submit(attempt, test, paper, data, user):
+    """Grade the answers in ``data`` (any mapping of question id -> choice) and complete the attempt."""
+    # الإجابات المرسلة + ما حُفظ كمسودة أثناء التنقل بين الصفحات
+    answers_dict = papers.collect_answers(paper, data, previous=attempt.answers)
+    key = grading.answer_key(test.id)
+    attempt.score = grading.grade(answers_dict, key)
+    attempt.review_snapshot = review.build_snapshot(paper, answers_dict, key)
+    attempt.completed = True
+    attempt.completed_at = timezone.now()
+    attempt.answers = answers_dict
+    # السماح بالمراجعة يكون عكس خيار "منع المراجعة"
+    # إذا كان test.prevent_review = True (منع) => attempt.review_enabled = False (غير مسموح)
+    # إذا كان test.prevent_review = False (عدم منع) => attempt.review_enabled = True (مسموح)
+    attempt.review_enabled = not test.prevent_review
+    attempt.save()
+    leaderboard.record(attempt)
+    # تحديث إحصائيات الأسئلة في الخلفية حتى لا تتزاحم التسليمات على نفس الصفوف
+    tasks.enqueue(tasks.record_attempt_stats, attempt.id)
+    events.publish(test.id, 'completed', score=attempt.score, **monitor_data(attempt, user))
+    notifications.notify_result(attempt)
+    return attempt
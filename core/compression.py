@@ -0,0 +1,22 @@
+"""
+Gzip for rendered pages only.
+
+The pages with large inline styles (profile, take_test, registration) shrink
+several times when compressed.  Django's ``GZipMiddleware`` would also
+compress streaming responses: that breaks byte-range video playback and
+holds back Server-Sent Events until the gzip buffer fills, so this
+subclass leaves every streaming response and non-text body untouched.
+"""
+from django.middleware.gzip import GZipMiddleware
+
+COMPRESSIBLE_TYPES = ('text/html', 'text/plain', 'application/json')
+
+
+class PageGZipMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if response.streaming:
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,111 @@
+"""
+Read-replica routing for reporting pages.
+
+Views decorated with ``@use_replica`` run their reads against the
+``replica`` database alias (when one is configured); everything else,
+and every write, goes to ``default``.  Replicas lag behind, so after any
+write request ``PinPrimaryMiddleware`` sets a short-lived cookie that
+keeps that browser on the primary for ``REPLICA_PIN_SECONDS`` and a student
+always sees the attempt they just submitted.
+
+Sessions are always read from the primary: a session created by a login a
+moment ago may not have reached the replica yet.
+
+A ``StreamingHttpResponse`` body runs after the view (and the decorator)
+returned; wrap it in ``stream_on_replica`` so its queries stay on the
+replica too.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPLICA_DB = 'replica'
+PIN_COOKIE = 'pin_primary'
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_DB in settings.DATABASES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return 'default'
+        if _use_replica.get() and replica_configured():
+            return REPLICA_DB
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # نفس البيانات في القاعدتين
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+@contextmanager
+def replica():
+    """Send reads inside the block to the replica."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def use_replica(view):
+    """Run the view's reads on the replica unless this client just wrote something."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if PIN_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        with replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def stream_on_replica(iterable):
+    """
+    Keep a streamed body's reads where the view's went: call it inside a
+    ``@use_replica`` view, and every step of ``iterable`` runs on the replica.
+    """
+    if not _use_replica.get():
+        return iterable
+    return _replica_steps(iter(iterable))
+
+
+def _replica_steps(iterator):
+    while True:
+        # نفعّل القاعدة الثانوية حول كل خطوة فقط، لا أثناء توقف المولّد عند yield
+        with replica():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class PinPrimaryMiddleware:
+    """After a write request, keep the client on the primary for a few seconds."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_configured() and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,115 @@
+"""
+Bulk student enrollment from a CSV roster.
+
+The roster has a header row with ``username`` and ``password`` columns and
+optional ``email`` and ``full_name``.  Password hashing (PBKDF2, the slow
+part) runs in a process pool, one hash per core; then all ``User`` and
+``Profile`` rows are inserted with ``bulk_create`` in a single transaction,
+so a failed import leaves nothing half-created.  Usernames that already
+exist, or repeat inside the file, are skipped and reported.
+"""
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+
+from .models import Profile
+
+REQUIRED_COLUMNS = ('username', 'password')
+INSERT_BATCH_SIZE = 500
+HASH_CHUNK_SIZE = 25
+
+
+def _init_hasher():
+    # مع spawn (ويندوز) تبدأ العملية من الصفر وتحتاج إعدادات Django لمعرفة خوارزمية التشفير
+    django.setup()
+
+
+def hash_passwords(passwords, processes=None):
+    """Hash ``passwords`` in parallel, keeping their order."""
+    if len(passwords) < 2 or processes == 1:
+        return [make_password(p) for p in passwords]
+    if multiprocessing.current_process().daemon:
+        # عمليات run_workers لا يُسمح لها بعمليات فرعية؛ PBKDF2 يحرر الـ GIL فتكفي الخيوط
+        with ThreadPoolExecutor(max_workers=processes or os.cpu_count()) as pool:
+            return list(pool.map(make_password, passwords))
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_hasher) as pool:
+        return list(pool.map(make_password, passwords, chunksize=HASH_CHUNK_SIZE))
+
+
+def read_roster(f):
+    """Parse a roster (text file object); return ``(rows, errors)``."""
+    reader = csv.DictReader(f)
+    columns = [c.strip().lower() for c in reader.fieldnames or []]
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        return [], [(1, f"الأعمدة المطلوبة غير موجودة: {', '.join(missing)}")]
+    reader.fieldnames = columns
+
+    rows, errors, seen = [], [], set()
+    for line, row in enumerate(reader, start=2):
+        username = (row.get('username') or '').strip()
+        password = row.get('password') or ''
+        if not username or not password:
+            errors.append((line, 'اسم المستخدم وكلمة المرور مطلوبان'))
+            continue
+        if username in seen:
+            errors.append((line, f'اسم المستخدم {username} مكرر في الملف'))
+            continue
+        seen.add(username)
+        rows.append({
+            'username': username,
+            'password': password,
+            'email': (row.get('email') or '').strip(),
+            'full_name': (row.get('full_name') or '').strip(),
+        })
+    return rows, errors
+
+
+def _existing_usernames(usernames):
+    existing = set()
+    for i in range(0, len(usernames), INSERT_BATCH_SIZE):
+        batch = usernames[i:i + INSERT_BATCH_SIZE]
+        existing.update(User.objects.filter(username__in=batch).values_list('username', flat=True))
+    return existing
+
+
+def import_students(rows, processes=None):
+    """Create a student account for every roster row whose username is free."""
+    existing = _existing_usernames([r['username'] for r in rows])
+    rows = [r for r in rows if r['username'] not in existing]
+    hashes = hash_passwords([r['password'] for r in rows], processes)
+
+    users = [
+        User(username=r['username'], email=r['email'], first_name=r['full_name'], password=hashed)
+        for r, hashed in zip(rows, hashes)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=INSERT_BATCH_SIZE)
+        # لا تعيد كل القواعد المعرّفات من bulk_create، فنقرأها بالاسم
+        user_ids = []
+        usernames = [u.username for u in users]
+        for i in range(0, len(usernames), INSERT_BATCH_SIZE):
+            batch = usernames[i:i + INSERT_BATCH_SIZE]
+            user_ids.extend(User.objects.filter(username__in=batch).values_list('id', flat=True))
+        # bulk_create لا يرسل post_save، فننشئ الملفات الشخصية هنا
+        Profile.objects.bulk_create(
+            [Profile(user_id=uid, role='student') for uid in user_ids],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+    return {'created': len(users), 'skipped': sorted(existing)}
+
+
+def import_roster_file(path, processes=None):
+    """Import a roster saved on disk (used by the admin upload task)."""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows, errors = read_roster(f)
+    result = import_students(rows, processes)
+    result['errors'] = [f'سطر {line}: {message}' for line, message in errors]
+    return result
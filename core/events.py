@@ -0,0 +1,139 @@
+"""
+Shared publish/subscribe for live exam monitoring.
+
+``take_test`` publishes ``started`` / ``completed`` events per test and the
+admin monitor streams them to the browser as Server-Sent Events.
+
+Events are rows of ``MonitorEvent``, so every web worker sees every event
+and event ids (the row ids) mean the same thing on every worker: a
+reconnecting ``EventSource`` sends ``Last-Event-ID`` and gets exactly what
+it missed, whichever worker it lands on.
+
+Publishing also moves a per-test cursor (the last event id) in the shared
+cache.  Open streams poll that cursor, which is a cache read, and only
+query the table when it moved, so many admins watching an idle exam cost
+nothing in the database.  Rows older than ``RETENTION`` are pruned now and
+then by ``publish``.
+
+Under ASGI the response is a long-lived stream.  Under WSGI (the sync
+gunicorn workers of the Procfile) holding a stream open would tie up a
+worker for as long as the tab is open, so each request answers at once with
+whatever is new and a ``retry:`` hint; ``EventSource`` reconnects after
+``RECONNECT_SECONDS`` with ``Last-Event-ID`` and the worker is free in
+between.
+"""
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import MonitorEvent
+
+POLL_SECONDS = 1
+RECONNECT_SECONDS = 3  # WSGI: فترة الاستطلاع القصير بين طلبين
+KEEPALIVE_SECONDS = 15
+BATCH_SIZE = 200
+RETENTION = timedelta(hours=12)
+PRUNE_EVERY = 500  # حدث
+
+
+def _cursor_key(test_id):
+    return f'events:cursor:{test_id}'
+
+
+def publish(test_id, event_type, **data):
+    event = MonitorEvent.objects.create(
+        test_id=test_id, event_type=event_type, data=json.loads(json.dumps(data, default=str)),
+    )
+    cache.set(_cursor_key(test_id), event.id, None)
+    if event.id % PRUNE_EVERY == 0:
+        MonitorEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+    return event.id
+
+
+def latest_id(test_id):
+    """Id of the newest event for ``test_id`` (0 if none)."""
+    cursor = cache.get(_cursor_key(test_id))
+    if cursor is None:
+        cursor = MonitorEvent.objects.filter(test_id=test_id).aggregate(last=Max('id'))['last'] or 0
+        cache.set(_cursor_key(test_id), cursor, None)
+    return cursor
+
+
+def fetch(test_id, after):
+    """``[(id, type, data), ...]`` newer than ``after``, or ``[]`` without a query when nothing moved."""
+    if latest_id(test_id) <= after:
+        return []
+    return list(
+        MonitorEvent.objects.filter(test_id=test_id, id__gt=after)
+        .order_by('id')
+        .values_list('id', 'event_type', 'data')[:BATCH_SIZE]
+    )
+
+
+def format_sse(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, default=str))
+    return '\n'.join(lines) + '\n\n'
+
+
+def _parse_last_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _start(test_id, last_event_id, initial):
+    """The id to resume after, and the opening SSE chunk (the snapshot, if any)."""
+    last = _parse_last_id(last_event_id)
+    if last is not None:
+        return last, ''
+    # بدون Last-Event-ID تكفي لقطة البداية، فنبدأ من آخر حدث موجود.
+    # نعطي اللقطة رقمه حتى يعود المتصفح بـ Last-Event-ID ولا يفوته ما يقع بين طلبين
+    last = latest_id(test_id)
+    return last, format_sse(*initial, event_id=last) if initial else ''
+
+
+async def stream_async(test_id, last_event_id=None, initial=None):
+    """SSE body for ASGI: sleeps between polls without holding a thread."""
+    last, opening = await sync_to_async(_start)(test_id, last_event_id, initial)
+    if opening:
+        yield opening
+    idle = 0
+    while True:
+        rows = await sync_to_async(fetch)(test_id, last)
+        for event_id, event_type, data in rows:
+            last = event_id
+            yield format_sse(event_type, data, event_id)
+        if rows:
+            idle = 0
+            continue
+        await asyncio.sleep(POLL_SECONDS)
+        idle += POLL_SECONDS
+        if idle >= KEEPALIVE_SECONDS:
+            idle = 0
+            yield ': ping\n\n'
+
+
+def poll_sync(test_id, last_event_id=None, initial=None):
+    """
+    SSE body for WSGI: the events so far, returned at once.  The browser
+    reconnects after ``RECONNECT_SECONDS`` instead of holding a worker.
+    """
+    last, opening = _start(test_id, last_event_id, initial)
+    chunks = [f'retry: {RECONNECT_SECONDS * 1000}\n\n', opening]
+    while True:
+        rows = fetch(test_id, last)
+        for event_id, event_type, data in rows:
+            last = event_id
+            chunks.append(format_sse(event_type, data, event_id))
+        if len(rows) < BATCH_SIZE:
+            return ''.join(chunks)
@@ -0,0 +1,174 @@
+"""
+Bulk export of attempts for offline analysis.
+
+Rows are read in primary-key order, ``chunk_size`` at a time (keyset
+pagination, no OFFSET), so an export never holds more than one chunk in
+memory.  When a test is given, each question gets its own ``q_<id>``
+column holding the chosen option; otherwise the raw ``answers`` JSON is
+written as one column.
+
+CSV needs nothing extra and streams straight to the browser.  Parquet
+needs ``pyarrow`` and is written by a background task (``save_parquet``)
+into ``PRIVATE_UPLOAD_ROOT/exports``, since its footer can only be written
+once every row is in; the dashboard links the finished file.
+"""
+import csv
+import json
+import os
+import tempfile
+import time
+
+from django.conf import settings
+
+from .models import Attempt, Question
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow اختياري
+    pa = pq = None
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_RETENTION = 24 * 60 * 60  # ثواني
+
+BASE_COLUMNS = [
+    'attempt_id', 'username', 'full_name', 'test_id', 'test_title',
+    'score', 'completed', 'completed_at',
+]
+_VALUES = [
+    'pk', 'user__username', 'user__first_name', 'test_id', 'test__title',
+    'score', 'completed', 'completed_at', 'answers',
+]
+
+
+def parquet_available():
+    return pa is not None
+
+
+def _question_ids(test_id):
+    if test_id is None:
+        return None
+    return list(Question.objects.filter(test_id=test_id).order_by('id').values_list('id', flat=True))
+
+
+def columns(question_ids):
+    if question_ids is None:
+        return BASE_COLUMNS + ['answers']
+    return BASE_COLUMNS + [f'q_{qid}' for qid in question_ids]
+
+
+def iter_chunks(test_id=None, completed_only=True, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of raw value tuples, one chunk at a time, in pk order."""
+    qs = Attempt.objects.order_by('pk').values_list(*_VALUES)
+    if test_id is not None:
+        qs = qs.filter(test_id=test_id)
+    if completed_only:
+        qs = qs.filter(completed=True)
+    last_pk = 0
+    while True:
+        chunk = list(qs.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1][0]
+
+
+def _flatten(row, question_ids):
+    *base, answers = row
+    answers = answers or {}
+    if question_ids is None:
+        return base + [json.dumps(answers, ensure_ascii=False)]
+    return base + [answers.get(str(qid)) for qid in question_ids]
+
+
+def iter_rows(test_id=None, completed_only=True, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the header and then one flat list per attempt."""
+    question_ids = _question_ids(test_id)
+    yield columns(question_ids)
+    for chunk in iter_chunks(test_id, completed_only, chunk_size):
+        for row in chunk:
+            yield _flatten(list(row), question_ids)
+
+
+class _Echo:
+    """Pseudo-buffer: ``csv.writer`` hands back each line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(test_id=None, completed_only=True, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV lines (with a UTF-8 BOM so Excel shows Arabic correctly)."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff'
+    for row in iter_rows(test_id, completed_only, chunk_size):
+        yield writer.writerow(row)
+
+
+def _arrow_schema(question_ids):
+    fields = [
+        ('attempt_id', pa.int64()),
+        ('username', pa.string()),
+        ('full_name', pa.string()),
+        ('test_id', pa.int64()),
+        ('test_title', pa.string()),
+        ('score', pa.int64()),
+        ('completed', pa.bool_()),
+        ('completed_at', pa.timestamp('us', tz='UTC')),
+    ]
+    if question_ids is None:
+        fields.append(('answers', pa.string()))
+    else:
+        fields.extend((f'q_{qid}', pa.int64()) for qid in question_ids)
+    return pa.schema(fields)
+
+
+def write_parquet(sink, test_id=None, completed_only=True, chunk_size=EXPORT_CHUNK_SIZE):
+    """Write a Parquet file to ``sink`` (a path or binary file), one row group per chunk."""
+    if pa is None:
+        raise RuntimeError('pyarrow is not installed; install it to export Parquet files')
+    question_ids = _question_ids(test_id)
+    schema = _arrow_schema(question_ids)
+    count = 0
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in iter_chunks(test_id, completed_only, chunk_size):
+            rows = [_flatten(list(row), question_ids) for row in chunk]
+            arrays = [
+                pa.array([row[i] for row in rows], type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
+
+
+def export_dir():
+    return os.path.join(settings.PRIVATE_UPLOAD_ROOT, 'exports')
+
+
+def export_path(name):
+    """Path of a finished export; ``name`` comes from a task result, never from the request."""
+    return os.path.join(export_dir(), os.path.basename(name))
+
+
+def prune_exports(max_age=EXPORT_RETENTION):
+    cutoff = time.time() - max_age
+    with os.scandir(export_dir()) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+
+def save_parquet(test_id=None):
+    """Write the export into the private exports directory; return what the download view needs."""
+    os.makedirs(export_dir(), exist_ok=True)
+    prune_exports()
+    with tempfile.NamedTemporaryFile('wb', suffix='.parquet', dir=export_dir(), delete=False) as f:
+        try:
+            rows = write_parquet(f, test_id=test_id)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    filename = f"attempts_test_{test_id}" if test_id else "attempts"
+    return {'file': os.path.basename(f.name), 'filename': f'{filename}.parquet', 'rows': rows}
@@ -20,7 +20,7 @@ class LessonForm(forms.ModelForm):
 class TestForm(forms.ModelForm):
     class Meta:
         model = Test
-        fields = ['title', 'time_limit', 'time_unit', 'prevent_review']
+        fields = ['title', 'time_limit', 'time_unit', 'prevent_review', 'pool_size', 'shuffle_choices', 'page_size']
 
 class QuestionForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,103 @@
+"""
+Gradebook: students × tests score matrix.
+
+The whole matrix is one grouped query: students LEFT JOIN their completed
+attempts, grouped by student, with one filtered ``MAX(score)`` per test
+column (``unique_together`` makes it the score of that test).  Rows are
+read with ``.iterator()`` and turned into cells as they arrive, so the CSV
+download streams and never holds the class in memory.
+
+Percentages divide by the size of the paper each student got: the
+question count comes from the cached answer key (``grading.answer_key``),
+capped by ``Test.pool_size``, so it costs no query when the cache is warm.
+
+The HTML page shows ``TESTS_PER_PAGE`` test columns at a time; the CSV has
+every test.
+"""
+import csv
+
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+
+from . import grading
+from .exports import _Echo
+from .models import Test
+
+TESTS_PER_PAGE = 20
+GRADEBOOK_CHUNK_SIZE = 500
+
+
+def paper_size(test):
+    questions = len(grading.answer_key(test.id))
+    if test.pool_size and test.pool_size < questions:
+        return test.pool_size
+    return questions
+
+
+def test_pages(per_page=TESTS_PER_PAGE):
+    return Paginator(Test.objects.only('id', 'title', 'pool_size').order_by('id'), per_page)
+
+
+def students():
+    return User.objects.filter(is_superuser=False, profile__role='student')
+
+
+def iter_rows(tests, chunk_size=GRADEBOOK_CHUNK_SIZE):
+    """
+    Yield ``(username, full_name, cells)`` per student, ordered by username.
+
+    ``cells`` has one ``(score, percent)`` per test, ``(None, None)`` when
+    the student has not completed it.
+    """
+    sizes = [paper_size(test) for test in tests]
+    aggregates = {
+        f't{test.id}': Max('attempt__score', filter=Q(attempt__test_id=test.id, attempt__completed=True))
+        for test in tests
+    }
+    aliases = list(aggregates)
+    qs = (
+        students()
+        .values('username', 'first_name', 'last_name')
+        .annotate(**aggregates)
+        .order_by('username')
+    )
+    for row in qs.iterator(chunk_size=chunk_size):
+        cells = []
+        for alias, size in zip(aliases, sizes):
+            score = row[alias]
+            if score is None:
+                cells.append((None, None))
+            else:
+                cells.append((score, round(100 * score / size) if size else None))
+        full_name = f"{row['first_name']} {row['last_name']}".strip()
+        yield row['username'], full_name, cells
+
+
+def iter_html_rows(tests, chunk_size=GRADEBOOK_CHUNK_SIZE):
+    """Like ``iter_rows`` but with display-ready ``(css_class, text)`` cells."""
+    for username, full_name, cells in iter_rows(tests, chunk_size):
+        html_cells = []
+        for score, percent in cells:
+            if score is None:
+                html_cells.append(('text-muted', '-'))
+            elif percent is None:
+                html_cells.append(('', str(score)))
+            else:
+                html_cells.append(('table-danger' if percent < 50 else 'table-success', f'{score} ({percent}%)'))
+        yield full_name or username, html_cells
+
+
+def iter_csv(tests, chunk_size=GRADEBOOK_CHUNK_SIZE):
+    """Yield CSV lines: two columns (score, percent) per test."""
+    writer = csv.writer(_Echo())
+    yield '\ufeff'
+    header = ['username', 'full_name']
+    for test in tests:
+        header += [test.title, f'{test.title} %']
+    yield writer.writerow(header)
+    for username, full_name, cells in iter_rows(tests, chunk_size):
+        line = [username, full_name]
+        for score, percent in cells:
+            line += ['' if score is None else score, '' if percent is None else percent]
+        yield writer.writerow(line)
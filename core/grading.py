@@ -0,0 +1,111 @@
+"""
+Grading helpers shared by ``take_test``, the admin and the regrade command.
+
+The answer key of a test (question id -> correct choice number) is cached so
+grading never has to load the ``Question`` rows again; it is invalidated from
+the ``Question`` signals whenever a question is saved or deleted.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from . import review
+from .models import Attempt, Question
+
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+REGRADE_CHUNK_SIZE = 2000
+
+
+def _answer_key_cache_key(test_id):
+    return f'answer_key:{test_id}'
+
+
+def answer_key(test_id):
+    """Return ``{question_id (str): correct_answer}`` for a test."""
+    key = cache.get(_answer_key_cache_key(test_id))
+    if key is None:
+        key = {
+            str(qid): correct
+            for qid, correct in Question.objects.filter(test_id=test_id).values_list('id', 'correct_answer')
+        }
+        cache.set(_answer_key_cache_key(test_id), key, ANSWER_KEY_TIMEOUT)
+    return key
+
+
+def invalidate_answer_key(test_id):
+    cache.delete(_answer_key_cache_key(test_id))
+
+
+def grade(answers, key):
+    """Count the answers in ``answers`` that match ``key``."""
+    score = 0
+    for question_id, chosen in (answers or {}).items():
+        correct = key.get(str(question_id))
+        if correct is None:
+            continue
+        try:
+            if int(chosen) == int(correct):
+                score += 1
+        except (ValueError, TypeError):
+            # تجاهل الإجابات غير الصالحة
+            pass
+    return score
+
+
+def _write_scores(pending):
+    """
+    Save ``{attempt_id: score}``.
+
+    Scores take only a handful of distinct values, so one
+    ``UPDATE ... WHERE id IN (...)`` per score is far cheaper than
+    ``bulk_update``'s per-row ``CASE WHEN``.
+    """
+    by_score = {}
+    for attempt_id, score in pending.items():
+        by_score.setdefault(score, []).append(attempt_id)
+    for score, ids in by_score.items():
+        Attempt.objects.filter(pk__in=ids).update(score=score)
+
+
+def regrade_test(test_id, chunk_size=REGRADE_CHUNK_SIZE):
+    """
+    Recompute ``Attempt.score`` for every completed attempt of a test.
+
+    Attempts are streamed with ``iterator()`` and only the changed scores are
+    written back, one chunk at a time, so memory stays bounded whatever the
+    number of attempts.
+    """
+    invalidate_answer_key(test_id)
+    key = answer_key(test_id)
+    checked = changed = 0
+    pending = {}
+    snapshots = []
+
+    attempts = (
+        Attempt.objects.filter(test_id=test_id, completed=True)
+        .only('id', 'answers', 'score', 'review_snapshot')
+        .order_by()
+    )
+    with transaction.atomic():
+        for attempt in attempts.iterator(chunk_size=chunk_size):
+            checked += 1
+            # لقطة المراجعة تتبع مفتاح الإجابات الجديد حتى تطابق الدرجة
+            if review.is_current(attempt.review_snapshot) and review.apply_key(attempt.review_snapshot, key):
+                snapshots.append(attempt)
+                if len(snapshots) >= chunk_size:
+                    Attempt.objects.bulk_update(snapshots, ['review_snapshot'])
+                    snapshots = []
+            score = grade(attempt.answers, key)
+            if score == attempt.score:
+                continue
+            pending[attempt.id] = score
+            if len(pending) >= chunk_size:
+                _write_scores(pending)
+                changed += len(pending)
+                pending = {}
+        if pending:
+            _write_scores(pending)
+            changed += len(pending)
+        if snapshots:
+            Attempt.objects.bulk_update(snapshots, ['review_snapshot'])
+
+    return {'checked': checked, 'changed': changed}
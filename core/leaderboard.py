@@ -0,0 +1,149 @@
+"""
+Per-test leaderboard.
+
+Every completed attempt has one ``LeaderboardEntry`` row, written when the
+attempt is submitted (and rebuilt after a regrade).  The table is indexed
+on ``(test, -score, completed_at)``, so:
+
+* a student's rank is ``1 + (entries of the test with a higher score)``,
+  one index range count, never a sort of the whole class;
+* the top N is the first N entries of that index.
+
+The top-N list and the score distribution are cached.  A new entry adds
+itself to the cached distribution and drops the top N only when it can
+enter it; a changed score (admin edit) drops both.  Concurrent submissions
+can race on the cached distribution, so it also expires after a minute.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Attempt, LeaderboardEntry
+
+TOP_N = 10
+TOP_TIMEOUT = 60 * 10
+DISTRIBUTION_TIMEOUT = 60
+REBUILD_CHUNK_SIZE = 2000
+
+
+def _top_key(test_id):
+    return f'leaderboard_top:{test_id}'
+
+
+def _distribution_key(test_id):
+    return f'leaderboard_distribution:{test_id}'
+
+
+def record(attempt):
+    """Add, update or (for an attempt no longer completed) remove its entry."""
+    previous = (
+        LeaderboardEntry.objects.filter(attempt_id=attempt.id)
+        .values_list('score', flat=True).first()
+    )
+    if not attempt.completed or attempt.completed_at is None:
+        if previous is not None:
+            LeaderboardEntry.objects.filter(attempt_id=attempt.id).delete()
+            invalidate(attempt.test_id)
+        return
+    LeaderboardEntry.objects.update_or_create(
+        attempt_id=attempt.id,
+        defaults={
+            'test_id': attempt.test_id,
+            'user_id': attempt.user_id,
+            'score': attempt.score,
+            'completed_at': attempt.completed_at,
+        },
+    )
+    if previous is not None and previous != attempt.score:
+        invalidate(attempt.test_id)
+        return
+    if previous is None:
+        _count_score(attempt.test_id, attempt.score)
+    cached = cache.get(_top_key(attempt.test_id))
+    if cached is not None and (len(cached) < TOP_N or attempt.score >= cached[-1]['score']):
+        cache.delete(_top_key(attempt.test_id))
+
+
+def _count_score(test_id, score):
+    """Add one new score to the cached distribution instead of recounting it."""
+    rows = cache.get(_distribution_key(test_id))
+    if rows is None:
+        return
+    counts = dict(rows)
+    counts[score] = counts.get(score, 0) + 1
+    cache.set(_distribution_key(test_id), sorted(counts.items(), reverse=True), DISTRIBUTION_TIMEOUT)
+
+
+def invalidate(test_id):
+    cache.delete_many([_top_key(test_id), _distribution_key(test_id)])
+
+
+def standing(attempt):
+    """``{'rank', 'total', 'percentile'}`` of a completed attempt (ties share a rank)."""
+    entries = LeaderboardEntry.objects.filter(test_id=attempt.test_id)
+    rank = entries.filter(score__gt=attempt.score).count() + 1
+    total = entries.count()
+    if not total:
+        return None
+    # نسبة الطلاب الذين حصلوا على درجة أقل أو مساوية
+    percentile = round(100 * (total - rank + 1) / total)
+    return {'rank': rank, 'total': total, 'percentile': percentile}
+
+
+def top(test_id):
+    rows = cache.get(_top_key(test_id))
+    if rows is None:
+        rows = [
+            {
+                'attempt_id': attempt_id,
+                'name': first_name or username,
+                'score': score,
+            }
+            for attempt_id, username, first_name, score in (
+                LeaderboardEntry.objects.filter(test_id=test_id)
+                .order_by('-score', 'completed_at')
+                .values_list('attempt_id', 'user__username', 'user__first_name', 'score')[:TOP_N]
+            )
+        ]
+        cache.set(_top_key(test_id), rows, TOP_TIMEOUT)
+    return rows
+
+
+def distribution(test_id):
+    """``[(score, count), ...]`` from the highest score down."""
+    rows = cache.get(_distribution_key(test_id))
+    if rows is None:
+        rows = list(
+            LeaderboardEntry.objects.filter(test_id=test_id)
+            .values_list('score')
+            .annotate(n=Count('id'))
+            .order_by('-score')
+        )
+        cache.set(_distribution_key(test_id), rows, DISTRIBUTION_TIMEOUT)
+    return rows
+
+
+def rebuild_test(test_id, chunk_size=REBUILD_CHUNK_SIZE):
+    """Recreate every entry of a test from its completed attempts."""
+    attempts = (
+        Attempt.objects.filter(test_id=test_id, completed=True, completed_at__isnull=False)
+        .values_list('id', 'user_id', 'score', 'completed_at')
+        .order_by()
+    )
+    count = 0
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(test_id=test_id).delete()
+        batch = []
+        for attempt_id, user_id, score, completed_at in attempts.iterator(chunk_size=chunk_size):
+            batch.append(LeaderboardEntry(
+                test_id=test_id, user_id=user_id, attempt_id=attempt_id,
+                score=score, completed_at=completed_at,
+            ))
+            if len(batch) >= chunk_size:
+                LeaderboardEntry.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        LeaderboardEntry.objects.bulk_create(batch)
+        count += len(batch)
+    invalidate(test_id)
+    return count
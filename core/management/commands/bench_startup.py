@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# يعمل في عملية Python جديدة حتى يُقاس الاستيراد من الصفر
+PROBE = r'''
+import json, os, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+imported = time.perf_counter()
+warm = {}
+if sys.argv[2] == '1':
+    from core import warmup
+    warm = {step: count for step, (count, _) in warmup.run().items()}
+warmed = time.perf_counter()
+from django.conf import settings
+from django.test import Client
+host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+client = Client(HTTP_HOST=host)
+timings = []
+for _ in range(2):
+    t = time.perf_counter()
+    response = client.get(sys.argv[1])
+    timings.append(time.perf_counter() - t)
+print(json.dumps({
+    'import': imported - started, 'warmup': warmed - imported,
+    'first': timings[0], 'second': timings[1], 'status': response.status_code, 'warm': warm,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure cold import time and first-request latency, with and without core.warmup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/login/', help='Page requested after startup')
+        parser.add_argument('--runs', type=int, default=3, help='Fresh processes per mode (the median is shown)')
+
+    def _probe(self, path, warm):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'edu_platform.settings')
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE, path, '1' if warm else '0'],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else 'probe failed')
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        runs = max(options['runs'], 1)
+        for warm in (False, True):
+            samples = [self._probe(options['path'], warm) for _ in range(runs)]
+            median = {
+                key: sorted(s[key] for s in samples)[len(samples) // 2]
+                for key in ('import', 'warmup', 'first', 'second')
+            }
+            self.stdout.write(
+                f"{'warm-up ' if warm else 'cold    '} "
+                f"import {median['import'] * 1000:7.1f}ms  "
+                f"warm-up {median['warmup'] * 1000:7.1f}ms  "
+                f"first request {median['first'] * 1000:7.1f}ms  "
+                f"second {median['second'] * 1000:6.1f}ms  "
+                f"(HTTP {samples[-1]['status']}{', ' + json.dumps(samples[-1]['warm']) if warm else ''})"
+            )
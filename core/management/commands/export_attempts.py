@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import exports
+
+
+class Command(BaseCommand):
+    help = 'Export attempts (with one column per question) as CSV or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test', type=int, help='Only this test (adds one column per question)')
+        parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+        parser.add_argument('--output', '-o', default='-', help="Output file ('-' = stdout, CSV only)")
+        parser.add_argument('--include-incomplete', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=exports.EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        kwargs = {
+            'test_id': options['test'],
+            'completed_only': not options['include_incomplete'],
+            'chunk_size': options['chunk_size'],
+        }
+        output = options['output']
+
+        if options['format'] == 'parquet':
+            if output == '-':
+                raise CommandError('Parquet export needs --output <file>')
+            if not exports.parquet_available():
+                raise CommandError('pyarrow is not installed')
+            count = exports.write_parquet(output, **kwargs)
+            self.stderr.write(self.style.SUCCESS(f'Wrote {count} attempts to {output}'))
+            return
+
+        out = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8', newline='')
+        try:
+            for line in exports.iter_csv(**kwargs):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
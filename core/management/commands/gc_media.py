@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import storage
+
+MEDIA_DIRS = ['videos', 'pdfs', 'questions', 'pdf_pages']
+
+
+class Command(BaseCommand):
+    help = 'Delete media files that no lesson or question references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Keep unreferenced files this long before deleting them')
+        parser.add_argument('--recount', action='store_true',
+                            help='Recompute reference counts from the database first')
+        parser.add_argument('--orphans', action='store_true',
+                            help='Also delete untracked files left in the media folders')
+        parser.add_argument('--dry-run', action='store_true', help='Only list what would be deleted')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        grace = timedelta(hours=options['grace_hours'])
+
+        if options['recount']:
+            changed = storage.recount()
+            self.stdout.write(f'Recounted references ({changed} blobs changed)')
+
+        deleted = storage.collect_garbage(grace, dry_run=dry_run)
+        for name in deleted:
+            self.stdout.write(f'  {name}')
+
+        orphans = []
+        if options['orphans']:
+            media = storage.media_storage()
+            cutoff = timezone.now() - grace
+            for name in storage.find_orphans(MEDIA_DIRS):
+                if media.get_modified_time(name) >= cutoff:
+                    continue
+                orphans.append(name)
+                self.stdout.write(f'  {name} (untracked)')
+                if not dry_run:
+                    media.delete(name)
+
+        verb = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(deleted) + len(orphans)} files'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import pdfs, tasks
+from core.models import Lesson
+
+
+class Command(BaseCommand):
+    help = 'Render page previews and extract text for lesson PDFs (needs PyMuPDF)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lesson', type=int, action='append', dest='lessons', help='Lesson id (can be repeated)')
+        parser.add_argument('--all', action='store_true', help='Every lesson that has a PDF')
+        parser.add_argument('--sync', action='store_true', help='Process here instead of queueing tasks')
+
+    def handle(self, *args, **options):
+        if not pdfs.available():
+            raise CommandError('PyMuPDF is not installed: pip install pymupdf')
+        if options['all']:
+            lesson_ids = list(Lesson.objects.exclude(pdf_file='').exclude(pdf_file=None).values_list('id', flat=True))
+        elif options['lessons']:
+            lesson_ids = options['lessons']
+        else:
+            raise CommandError('Pass --lesson <id> or --all')
+
+        for lesson_id in lesson_ids:
+            if options['sync']:
+                result = pdfs.process_lesson_pdf(lesson_id)
+                self.stdout.write(f'Lesson {lesson_id}: {result}')
+            else:
+                tasks.enqueue(tasks.process_lesson_pdf, lesson_id)
+        if not options['sync']:
+            self.stdout.write(self.style.SUCCESS(f'Queued {len(lesson_ids)} lessons'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import analytics
+from core.models import Test
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-question analytics from stored attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test', type=int, action='append', dest='tests', help='Test id (can be repeated)')
+        parser.add_argument('--all', action='store_true', help='Rebuild every test')
+        parser.add_argument('--chunk-size', type=int, default=analytics.STATS_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            test_ids = list(Test.objects.values_list('id', flat=True))
+        elif options['tests']:
+            test_ids = options['tests']
+        else:
+            raise CommandError('Pass --test <id> or --all')
+
+        for test_id in test_ids:
+            result = analytics.rebuild_test_stats(test_id, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Test {test_id}: {result['attempts']} attempts, {result['questions']} questions"
+            ))
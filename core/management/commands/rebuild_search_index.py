@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import search
+from core.models import Lesson, Question
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for lessons and questions'
+
+    def handle(self, *args, **options):
+        search.create_index()
+        with transaction.atomic():
+            count = search.rebuild_index(Lesson.objects.all(), Question.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} documents'))
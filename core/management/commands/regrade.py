@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import analytics, grading, leaderboard
+from core.models import Test
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored attempt scores after answer keys change'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test', type=int, action='append', dest='tests', help='Test id (can be repeated)')
+        parser.add_argument('--all', action='store_true', help='Regrade every test')
+        parser.add_argument('--chunk-size', type=int, default=grading.REGRADE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            test_ids = list(Test.objects.values_list('id', flat=True))
+        elif options['tests']:
+            test_ids = options['tests']
+            missing = set(test_ids) - set(Test.objects.filter(id__in=test_ids).values_list('id', flat=True))
+            if missing:
+                raise CommandError(f'Unknown test id(s): {", ".join(map(str, sorted(missing)))}')
+        else:
+            raise CommandError('Pass --test <id> or --all')
+
+        for test_id in test_ids:
+            started = time.monotonic()
+            result = grading.regrade_test(test_id, chunk_size=options['chunk_size'])
+            analytics.rebuild_test_stats(test_id, chunk_size=options['chunk_size'])
+            leaderboard.rebuild_test(test_id)
+            self.stdout.write(self.style.SUCCESS(
+                f"Test {test_id}: checked {result['checked']}, changed {result['changed']} "
+                f"in {time.monotonic() - started:.2f}s"
+            ))
@@ -0,0 +1,59 @@
+import multiprocessing
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_main(stop_event, poll_interval, once):
+    # مع spawn (ويندوز) تبدأ العملية من الصفر فنحتاج تهيئة Django
+    django.setup()
+    from core import tasks
+    try:
+        tasks.work(stop_event=stop_event, poll_interval=poll_interval, once=once)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run background task workers (uploads processing, regrading, emails...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        from core import tasks
+
+        requeued = tasks.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale task(s)')
+
+        if options['processes'] <= 1:
+            processed = tasks.work(poll_interval=options['poll_interval'], once=options['once'])
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} task(s)'))
+            return
+
+        # لا نورّث اتصالات قاعدة البيانات المفتوحة للعمليات الفرعية
+        connections.close_all()
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(stop_event, options['poll_interval'], options['once']),
+                daemon=True,
+            )
+            for _ in range(options['processes'])
+        ]
+        for w in workers:
+            w.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {len(workers)} worker(s)'))
+        try:
+            for w in workers:
+                w.join()
+        except KeyboardInterrupt:
+            stop_event.set()
+            for w in workers:
+                w.join()
+        self.stdout.write('Workers stopped')
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import notifications
+
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails in batches over one SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Stop after this many emails')
+        parser.add_argument('--loop', action='store_true', help='Keep sending, waiting out the per-minute limit')
+
+    def handle(self, *args, **options):
+        while True:
+            result = notifications.send_pending(limit=options['limit'])
+            self.stdout.write(f"Sent {result['sent']}, retrying {result['retry']}")
+            if not options['loop'] or notifications.next_due() is None:
+                break
+            time.sleep(60 - time.time() % 60 if result['throttled'] else 5)
+        self.stdout.write(self.style.SUCCESS('Done'))
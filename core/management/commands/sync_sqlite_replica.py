@@ -0,0 +1,28 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db_routing import REPLICA_DB
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary database into the SQLite replica file (local replica testing)'
+
+    def handle(self, *args, **options):
+        if REPLICA_DB not in settings.DATABASES:
+            raise CommandError('No replica configured: set DATABASE_REPLICA_NAME')
+        primary = settings.DATABASES['default']
+        replica = settings.DATABASES[REPLICA_DB]
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError('Only SQLite databases can be synced this way; use real replication otherwise')
+
+        # backup() ينسخ صفحة بصفحة بشكل متسق حتى لو كانت القاعدة قيد الاستخدام
+        source = sqlite3.connect(str(primary['NAME']))
+        target = sqlite3.connect(str(replica['NAME']))
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f"Copied {primary['NAME']} -> {replica['NAME']}"))
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from core import search
+
+
+def create_and_fill_index(apps, schema_editor):
+    search.create_index(schema_editor)
+    Lesson = apps.get_model('core', 'Lesson')
+    Question = apps.get_model('core', 'Question')
+    search.rebuild_index(Lesson.objects.all(), Question.objects.all())
+
+
+def drop_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_remove_test_review_enabled_test_prevent_review'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_and_fill_index, drop_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_question_analytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='seed',
+            field=models.PositiveIntegerField(default=0, help_text='بذرة سحب الأسئلة وترتيب الاختيارات لهذا الطالب'),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='pool_size',
+            field=models.PositiveIntegerField(default=0, help_text='يسحب هذا العدد عشوائيًا من بنك أسئلة الاختبار لكل طالب (0 = كل الأسئلة).', verbose_name='عدد الأسئلة لكل طالب'),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='shuffle_choices',
+            field=models.BooleanField(default=False, help_text='إذا تم تحديده، تظهر اختيارات كل سؤال بترتيب مختلف لكل طالب.', verbose_name='ترتيب عشوائي للاختيارات'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_question_pools'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='page_size',
+            field=models.PositiveIntegerField(default=0, help_text='يعرض الاختبار على صفحات بهذا العدد من الأسئلة (0 = كل الأسئلة في صفحة واحدة).', verbose_name='عدد الأسئلة في كل صفحة'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2 on 2026-10-19 12:20
+
+import core.storage
+from django.db import migrations, models
+
+
+def count_existing_files(apps, schema_editor):
+    MediaBlob = apps.get_model('core', 'MediaBlob')
+    counts = {}
+    for model_name, fields in (('Lesson', ('video_file', 'pdf_file')), ('Question', ('image',))):
+        for row in apps.get_model('core', model_name).objects.values_list(*fields):
+            for name in row:
+                if name:
+                    counts[name] = counts.get(name, 0) + 1
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, refcount=refs) for name, refs in counts.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='مسار الملف داخل MEDIA_ROOT', max_length=255, unique=True)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='pdf_file',
+            field=models.FileField(blank=True, null=True, storage=core.storage.media_storage, upload_to='pdfs/'),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='video_file',
+            field=models.FileField(blank=True, null=True, storage=core.storage.media_storage, upload_to='videos/'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.media_storage, upload_to='questions/'),
+        ),
+        migrations.RunPython(count_existing_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-19 12:24
+
+import core.storage
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='pdf_text',
+            field=models.TextField(blank=True, editable=False, help_text='النص المستخرج من ملف PDF (للبحث)'),
+        ),
+        migrations.CreateModel(
+            name='LessonPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('image', models.ImageField(storage=core.storage.media_storage, upload_to='pdf_pages/')),
+                ('width', models.PositiveIntegerField(default=0)),
+                ('height', models.PositiveIntegerField(default=0)),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_pages', to='core.lesson')),
+            ],
+            options={
+                'ordering': ['number'],
+                'unique_together': {('lesson', 'number')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    Profile = apps.get_model('core', 'Profile')
+    missing = User.objects.filter(profile__isnull=True).values_list('id', 'is_staff', 'is_superuser')
+    Profile.objects.bulk_create(
+        [
+            Profile(user_id=user_id, role='admin' if is_staff or is_superuser else 'student')
+            for user_id, is_staff, is_superuser in missing.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0017_lesson_pdf_pages'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_backfill_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='review_snapshot',
+            field=models.JSONField(blank=True, editable=False, help_text='الأسئلة كما ظهرت للطالب وقت التسليم (للمراجعة)', null=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-19 12:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_leaderboard(apps, schema_editor):
+    Attempt = apps.get_model('core', 'Attempt')
+    LeaderboardEntry = apps.get_model('core', 'LeaderboardEntry')
+    completed = Attempt.objects.filter(completed=True, completed_at__isnull=False).values_list(
+        'id', 'test_id', 'user_id', 'score', 'completed_at'
+    )
+    LeaderboardEntry.objects.bulk_create(
+        [
+            LeaderboardEntry(attempt_id=attempt_id, test_id=test_id, user_id=user_id,
+                             score=score, completed_at=completed_at)
+            for attempt_id, test_id, user_id, score, completed_at in completed.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0019_attempt_review_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField()),
+                ('completed_at', models.DateTimeField()),
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to='core.attempt')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard', to='core.test')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['test', '-score', 'completed_at'], name='leaderboard_rank_idx'),
+        ),
+        migrations.RunPython(fill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 12:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_outbound_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonitorEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=20)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monitor_events', to='core.test')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='monitorevent',
+            index=models.Index(fields=['test', 'id'], name='core_monito_test_id_ec6994_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_monitor_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='error',
+            field=models.CharField(blank=True, help_text='سبب فشل التحقق من الملف بعد آخر جزء', max_length=255),
+        ),
+    ]
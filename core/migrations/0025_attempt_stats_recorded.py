@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 12:59
+
+from django.db import migrations, models
+
+
+def queue_rebuilds(apps, schema_editor):
+    # لا توجد صفوف إحصائيات للمحاولات القديمة بعد: نترك العلامة False ونطلب من العمال بناءها لكل اختبار
+    # (صفوف Task مباشرة لأن tasks.enqueue يستخدم النماذج الحالية لا نماذج الترحيل)
+    Attempt = apps.get_model('core', 'Attempt')
+    Task = apps.get_model('core', 'Task')
+    test_ids = Attempt.objects.filter(completed=True).values_list('test_id', flat=True).distinct().order_by()
+    Task.objects.bulk_create([Task(name='rebuild_test_stats', args=[test_id]) for test_id in test_ids])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_upload_error'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='stats_recorded',
+            field=models.BooleanField(default=False, editable=False, help_text='أضيفت إلى إحصائيات الأسئلة (حتى لا تُحسب مرتين)'),
+        ),
+        migrations.RunPython(queue_rebuilds, migrations.RunPython.noop),
+    ]
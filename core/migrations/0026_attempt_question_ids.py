@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_attempt_stats_recorded'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='question_ids',
+            field=models.JSONField(blank=True, editable=False, help_text='الأسئلة المسحوبة لهذا الطالب عند البدء (للاختبارات ذات عدد أسئلة محدد)', null=True),
+        ),
+    ]
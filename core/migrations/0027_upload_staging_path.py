@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_attempt_question_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='upload',
+            name='path',
+            field=models.CharField(help_text='أثناء الرفع: داخل PRIVATE_UPLOAD_ROOT/uploads، وبعد اكتماله: داخل MEDIA_ROOT', max_length=255),
+        ),
+    ]
@@ -1,5 +1,10 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .storage import media_storage
 
 class Profile(models.Model):
     ROLE_CHOICES = (('student','Student'), ('admin','Admin'))
@@ -18,8 +23,8 @@ class Lesson(models.Model):
     title = models.CharField(max_length=255)
     lesson_type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='text')
     content = models.TextField(blank=True)
-    video_file = models.FileField(upload_to='videos/', blank=True, null=True)
-    pdf_file = models.FileField(upload_to='pdfs/', blank=True, null=True)
+    video_file = models.FileField(upload_to='videos/', storage=media_storage, blank=True, null=True)
+    pdf_file = models.FileField(upload_to='pdfs/', storage=media_storage, blank=True, null=True)
     text_position = models.CharField(
         max_length=10,
         choices=(('top', 'النص فوق الفيديو'), ('bottom', 'النص تحت الفيديو')),
@@ -28,11 +33,45 @@ class Lesson(models.Model):
         null=True
     )
     is_hidden = models.BooleanField(default=False, verbose_name="إخفاء الدرس", help_text="إذا تم تحديده، سيتم إخفاء الدرس عن الطلاب.")
+    pdf_text = models.TextField(blank=True, editable=False, help_text='النص المستخرج من ملف PDF (للبحث)')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.title
 
+class LessonPage(models.Model):
+    """صورة مصغرة لصفحة من ملف PDF الدرس، تُعرض صفحة صفحة بدل تحميل الملف كاملاً."""
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='pdf_pages')
+    number = models.PositiveIntegerField()
+    image = models.ImageField(upload_to='pdf_pages/', storage=media_storage)
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['number']
+        unique_together = ('lesson', 'number')
+
+    def __str__(self):
+        return f"{self.lesson_id} p{self.number}"
+
+class LessonProgress(models.Model):
+    """تقدم الطالب في فيديو الدرس: المقاطع التي شاهدها فعلاً ونسبة الإكمال."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_progress')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='progress')
+    position = models.FloatField(default=0, help_text='آخر موضع في الفيديو (ثوانٍ)')
+    duration = models.FloatField(default=0)
+    watched = models.JSONField(default=list, blank=True, help_text='مقاطع [بداية، نهاية] التي شوهدت (ثوانٍ)')
+    watched_seconds = models.FloatField(default=0)
+    percent = models.PositiveSmallIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'lesson')
+
+    def __str__(self):
+        return f"{self.user_id} - {self.lesson_id} ({self.percent}%)"
+
 class Test(models.Model):
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
@@ -47,6 +86,21 @@ class Test(models.Model):
         verbose_name="منع مراجعة الاختبار", 
         help_text="إذا تم تحديده، لن يتمكن الطالب من مراجعة إجاباته بعد انتهاء الاختبار."
     )
+    pool_size = models.PositiveIntegerField(
+        default=0,
+        verbose_name="عدد الأسئلة لكل طالب",
+        help_text="يسحب هذا العدد عشوائيًا من بنك أسئلة الاختبار لكل طالب (0 = كل الأسئلة)."
+    )
+    shuffle_choices = models.BooleanField(
+        default=False,
+        verbose_name="ترتيب عشوائي للاختيارات",
+        help_text="إذا تم تحديده، تظهر اختيارات كل سؤال بترتيب مختلف لكل طالب."
+    )
+    page_size = models.PositiveIntegerField(
+        default=0,
+        verbose_name="عدد الأسئلة في كل صفحة",
+        help_text="يعرض الاختبار على صفحات بهذا العدد من الأسئلة (0 = كل الأسئلة في صفحة واحدة)."
+    )
 
     def __str__(self):
         return self.title
@@ -54,7 +108,7 @@ class Test(models.Model):
 class Question(models.Model):
     test = models.ForeignKey(Test, on_delete=models.CASCADE)
     text = models.TextField(blank=True)
-    image = models.ImageField(upload_to='questions/', blank=True, null=True)  # جديد
+    image = models.ImageField(upload_to='questions/', storage=media_storage, blank=True, null=True)  # جديد
     choices = models.TextField(help_text='comma separated choices')
     correct_answer = models.PositiveSmallIntegerField(help_text='رقم الخيار الصحيح (1 أو 2 أو 3 أو 4)')  # جديد
 
@@ -76,9 +130,180 @@ class Attempt(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     answers = models.JSONField(default=dict, blank=True)
     review_enabled = models.BooleanField(default=False)  # أضف هذا السطر أو عدله ليكون هكذا
+    seed = models.PositiveIntegerField(default=0, help_text='بذرة سحب الأسئلة وترتيب الاختيارات لهذا الطالب')
+    question_ids = models.JSONField(null=True, blank=True, editable=False, help_text='الأسئلة المسحوبة لهذا الطالب عند البدء (للاختبارات ذات عدد أسئلة محدد)')
+    review_snapshot = models.JSONField(null=True, blank=True, editable=False, help_text='الأسئلة كما ظهرت للطالب وقت التسليم (للمراجعة)')
+    stats_recorded = models.BooleanField(default=False, editable=False, help_text='أضيفت إلى إحصائيات الأسئلة (حتى لا تُحسب مرتين)')
 
     class Meta:
         unique_together = ('user','test')
 
     def __str__(self):
         return f"{self.user.username} - {self.test.title}"
+
+class LeaderboardEntry(models.Model):
+    """نتيجة محاولة مكتملة في ترتيب الاختبار (جدول ملخص مفهرس بالدرجة)."""
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='leaderboard')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    attempt = models.OneToOneField(Attempt, on_delete=models.CASCADE, related_name='leaderboard_entry')
+    score = models.IntegerField()
+    completed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['test', '-score', 'completed_at'], name='leaderboard_rank_idx')]
+
+    def __str__(self):
+        return f"{self.test_id}: {self.user_id} ({self.score})"
+
+class TestStat(models.Model):
+    """إحصائيات مجمعة لاختبار (تحدث تدريجيًا مع كل محاولة مكتملة)."""
+    test = models.OneToOneField(Test, on_delete=models.CASCADE, related_name='stats')
+    attempts = models.PositiveIntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_sq_sum = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.attempts if self.attempts else 0
+
+    def __str__(self):
+        return f"{self.test.title} ({self.attempts})"
+
+class QuestionStat(models.Model):
+    """
+    إحصائيات سؤال: نسبة الإجابة الصحيحة، توزيع الاختيارات، ومعامل التمييز.
+
+    نخزن مجاميع درجات الطلاب (وليس المتوسطات) حتى يمكن إضافة محاولة جديدة
+    بدون إعادة قراءة المحاولات السابقة.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='stats')
+    responses = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    unanswered = models.PositiveIntegerField(default=0)
+    choice_counts = models.JSONField(default=dict, blank=True)
+    score_sum = models.BigIntegerField(default=0)
+    score_sq_sum = models.BigIntegerField(default=0)
+    correct_score_sum = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def difficulty(self):
+        """نسبة من أجابوا إجابة صحيحة (0..1)."""
+        return self.correct / self.responses if self.responses else None
+
+    @property
+    def discrimination(self):
+        """Point-biserial correlation between this item and the total score."""
+        n, n1 = self.responses, self.correct
+        if n < 2 or n1 in (0, n):
+            return None
+        mean = self.score_sum / n
+        variance = self.score_sq_sum / n - mean * mean
+        if variance <= 0:
+            return None
+        mean1 = self.correct_score_sum / n1
+        mean0 = (self.score_sum - self.correct_score_sum) / (n - n1)
+        p = n1 / n
+        return (mean1 - mean0) / variance ** 0.5 * (p * (1 - p)) ** 0.5
+
+    def __str__(self):
+        return f"Q{self.question_id} ({self.responses})"
+
+class Upload(models.Model):
+    """رفع ملف كبير على أجزاء (قابل للاستكمال) لفيديو أو PDF درس."""
+    FIELD_CHOICES = (('video_file', 'Video'), ('pdf_file', 'PDF'))
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='uploads')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    filename = models.CharField(max_length=255)
+    path = models.CharField(max_length=255, help_text='أثناء الرفع: داخل PRIVATE_UPLOAD_ROOT/uploads، وبعد اكتماله: داخل MEDIA_ROOT')
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True, help_text='SHA-256 للملف كاملاً (اختياري)')
+    completed = models.BooleanField(default=False)
+    error = models.CharField(max_length=255, blank=True, help_text='سبب فشل التحقق من الملف بعد آخر جزء')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+class MediaBlob(models.Model):
+    """ملف مخزَّن مرة واحدة باسم بصمته (SHA-256) مع عدد الحقول التي تشير إليه."""
+    name = models.CharField(max_length=255, unique=True, help_text='مسار الملف داخل MEDIA_ROOT')
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+class Task(models.Model):
+    """مهمة خلفية تنفذها عمليات run_workers خارج دورة الطلب."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class MonitorEvent(models.Model):
+    """حدث بدء/تسليم لمتابعة الاختبار المباشرة؛ مشترك بين كل العمليات ورقمه من قاعدة البيانات."""
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='monitor_events')
+    event_type = models.CharField(max_length=20)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['test', 'id'])]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.test_id})"
+
+
+class OutboundEmail(models.Model):
+    """رسالة بريد في طابور الإرسال؛ تُرسل على دفعات عبر اتصال SMTP واحد."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+    kind = models.CharField(max_length=20, blank=True)
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.kind or 'email'} -> {self.to} ({self.status})"
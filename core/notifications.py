@@ -0,0 +1,274 @@
+"""
+Email notifications: exam results, new lessons, password changes.
+
+Nothing is sent inside a request.  ``notify_*`` only inserts
+``OutboundEmail`` rows (a new lesson does not even do that: a background
+task writes one row per student in bulk) and schedules the ``send_emails``
+task.  The worker then:
+
+* claims due rows ``EMAIL_BATCH_SIZE`` at a time (compare-and-set, so two
+  workers never send the same row),
+* sends them with ``send_messages`` over one SMTP connection that stays
+  open for the whole run, instead of one connection per email,
+* stops at ``EMAIL_RATE_PER_MINUTE`` messages per minute (counted in the
+  shared cache, so across all workers) and reschedules itself,
+* retries a failed message with exponential backoff up to
+  ``max_attempts``, then marks it ``failed``.
+
+For local testing point ``EMAIL_HOST``/``EMAIL_PORT`` at a stand-in SMTP
+server (``python -m aiosmtpd -n -l localhost:1025``) or set
+``EMAIL_BACKEND`` to the console backend.
+"""
+import logging
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Min
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import tasks
+from .models import Lesson, OutboundEmail, Task
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+EMAIL_BATCH_SIZE = 50
+EMAIL_RATE_PER_MINUTE = 300
+RETRY_BASE_DELAY = 60  # ثواني، تتضاعف مع كل محاولة
+STALE_AFTER = timedelta(minutes=15)
+QUEUE_CHUNK_SIZE = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# --- Building and queueing ---
+
+def build(kind, to, template, context):
+    """An unsaved ``OutboundEmail`` from ``emails/<template>_subject.txt`` and ``emails/<template>.txt``."""
+    context = {'site_url': _setting('FRONTEND_URL', ''), **context}
+    subject = render_to_string(f'emails/{template}_subject.txt', context)
+    return OutboundEmail(
+        kind=kind,
+        to=to,
+        # سطر العنوان لا يقبل فواصل أسطر
+        subject=' '.join(subject.split()),
+        body=render_to_string(f'emails/{template}.txt', context).strip(),
+    )
+
+
+def schedule_send(delay=0):
+    """Make sure one ``send_emails`` task is waiting (not one per queued email)."""
+    if not Task.objects.filter(name='send_emails', status='pending').exists():
+        tasks.enqueue(send_emails, delay=delay)
+
+
+def notify_result(attempt):
+    user = attempt.user
+    if not user.email:
+        return None
+    email = build('result', user.email, 'result', {'user': user, 'attempt': attempt, 'test': attempt.test})
+    email.save()
+    schedule_send()
+    return email
+
+
+def notify_password_changed(user):
+    if not user.email:
+        return None
+    email = build('password', user.email, 'password_changed', {'user': user})
+    email.save()
+    schedule_send()
+    return email
+
+
+def notify_new_lesson(lesson):
+    """Queue the per-student emails in the background; the class may be thousands."""
+    if not lesson.is_hidden:
+        tasks.enqueue(queue_lesson_emails, lesson.id)
+
+
+@task
+def queue_lesson_emails(lesson_id, chunk_size=QUEUE_CHUNK_SIZE):
+    lesson = Lesson.objects.filter(pk=lesson_id, is_hidden=False).first()
+    if lesson is None:
+        return 0
+    students = (
+        User.objects.filter(is_active=True, profile__role='student')
+        .exclude(email='')
+        .order_by('id')
+    )
+    count = 0
+    batch = []
+    # كل الصفوف أو لا شيء: لو فشلت المهمة في المنتصف لا تُرسل إعادة المحاولة رسالة ثانية لمن سبق
+    with transaction.atomic():
+        for user in students.iterator(chunk_size=chunk_size):
+            batch.append(build('lesson', user.email, 'new_lesson', {'user': user, 'lesson': lesson}))
+            if len(batch) >= chunk_size:
+                OutboundEmail.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        OutboundEmail.objects.bulk_create(batch)
+        count += len(batch)
+    if count:
+        schedule_send()
+    return count
+
+
+# --- Sending ---
+
+def _minute_key():
+    return f'emails_sent:{int(time.time() // 60)}'
+
+
+def allowance():
+    """How many more emails may go out this minute (across all workers); only delivered ones count."""
+    return max(_setting('EMAIL_RATE_PER_MINUTE', EMAIL_RATE_PER_MINUTE) - (cache.get(_minute_key()) or 0), 0)
+
+
+def _count_sent(n):
+    key = _minute_key()
+    # غير ذري في FileBasedCache، ويكفي هنا لحد تقريبي
+    cache.set(key, (cache.get(key) or 0) + n, 120)
+
+
+def requeue_stale():
+    """Return emails left ``sending`` by a crashed worker to the queue."""
+    return OutboundEmail.objects.filter(
+        status='sending', updated_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status='pending', run_after=timezone.now())
+
+
+def claim(limit):
+    now = timezone.now()
+    candidates = list(
+        OutboundEmail.objects.filter(status='pending', run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    claimed = [
+        email_id for email_id in candidates
+        # compare-and-set: worker آخر قد يكون أخذ الرسالة قبلنا
+        if OutboundEmail.objects.filter(id=email_id, status='pending').update(
+            status='sending', attempts=F('attempts') + 1, updated_at=now,
+        )
+    ]
+    return list(OutboundEmail.objects.filter(id__in=claimed).order_by('id'))
+
+
+def _message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.to], connection=connection,
+    )
+    if email.html:
+        message.attach_alternative(email.html, 'text/html')
+    return message
+
+
+def _fail(email, error):
+    email.last_error = str(error)
+    if email.attempts >= email.max_attempts:
+        email.status = 'failed'
+        logger.warning('Giving up on %s after %s attempts: %s', email, email.attempts, error)
+    else:
+        email.status = 'pending'
+        email.run_after = timezone.now() + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (email.attempts - 1))
+    email.save(update_fields=['status', 'run_after', 'last_error', 'updated_at'])
+
+
+def _server_error(error):
+    """True when the connection failed rather than the server rejecting this one message."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return not isinstance(error, smtplib.SMTPException)
+
+
+def release(emails, error):
+    """Put claimed emails back without spending an attempt (the server, not the message, failed)."""
+    return OutboundEmail.objects.filter(id__in=[email.id for email in emails], status='sending').update(
+        status='pending',
+        attempts=F('attempts') - 1,
+        run_after=timezone.now() + timedelta(seconds=RETRY_BASE_DELAY),
+        last_error=str(error),
+        updated_at=timezone.now(),
+    )
+
+
+def send_pending(limit=None, connection=None):
+    """
+    Send due emails over one SMTP connection until the queue is empty, the
+    per-minute allowance is spent or ``limit`` emails were tried.
+    """
+    requeue_stale()
+    batch_size = _setting('EMAIL_BATCH_SIZE', EMAIL_BATCH_SIZE)
+    connection = connection or get_connection(fail_silently=False)
+    result = {'sent': 0, 'retry': 0, 'throttled': False}
+    opened = False
+    try:
+        while limit is None or result['sent'] + result['retry'] < limit:
+            room = allowance()
+            if not room:
+                result['throttled'] = True
+                break
+            size = min(batch_size, room)
+            if limit is not None:
+                size = min(size, limit - result['sent'] - result['retry'])
+            batch = claim(size)
+            if not batch:
+                break
+
+            sent_ids = []
+            for i, email in enumerate(batch):
+                try:
+                    if not opened:
+                        connection.open()
+                        opened = True
+                    if not connection.send_messages([_message(email, connection)]):
+                        raise smtplib.SMTPException('message was not accepted')
+                except OSError as e:  # SMTPException يرث من OSError
+                    if not _server_error(e):
+                        _fail(email, e)
+                        result['retry'] += 1
+                        continue
+                    # الخادم غير متاح أو أغلق الاتصال: نعيد بقية الدفعة ونحاول في جولة لاحقة
+                    if opened:
+                        connection.close()
+                        opened = False
+                    result['retry'] += release(batch[i:], e)
+                    break
+                else:
+                    sent_ids.append(email.id)
+            OutboundEmail.objects.filter(id__in=sent_ids).update(
+                status='sent', sent_at=timezone.now(), last_error='', updated_at=timezone.now(),
+            )
+            result['sent'] += len(sent_ids)
+            _count_sent(len(sent_ids))
+            if not opened:
+                break
+    finally:
+        if opened:
+            connection.close()
+    return result
+
+
+def next_due():
+    return OutboundEmail.objects.filter(status='pending').aggregate(at=Min('run_after'))['at']
+
+
+@task
+def send_emails():
+    result = send_pending()
+    at = next_due()
+    if at is not None:
+        # بقيت رسائل: حد الدقيقة أو إعادة محاولة مؤجلة
+        delay = 60 - int(time.time()) % 60 if result['throttled'] else (at - timezone.now()).total_seconds()
+        schedule_send(delay=max(int(delay), 1))
+    return result
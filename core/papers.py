@@ -0,0 +1,154 @@
+"""
+Per-student exam papers.
+
+A test with ``pool_size`` draws that many questions from its bank when the
+attempt starts and stores their ids on ``Attempt.question_ids``, so adding
+or deleting bank questions mid-exam never changes which questions a
+student is graded on.  A test with ``shuffle_choices`` shows each
+question's choices in an order derived from the attempt's seed and the
+question id alone.  The assembled paper is a plain list of dicts cached
+per (test, seed, drawn ids, content version), so the exam page, grading and
+review never re-parse or re-query the questions.
+
+Choice inputs carry the *original* choice number as their value; shuffling
+only changes display order, so stored answers and ``correct_answer`` keep
+the same numbering everywhere.
+"""
+import hashlib
+import random
+import time
+
+from django.core.cache import cache
+
+from . import storage
+from .models import Attempt, Question
+
+PAPER_TIMEOUT = 60 * 60 * 6
+PAPER_FORMAT = 3  # يتغير عند تغيير شكل عناصر الورقة فلا تُقرأ نسخ قديمة من الكاش
+MAX_SEED = 2 ** 31 - 1
+
+
+def new_seed():
+    return random.SystemRandom().randint(1, MAX_SEED)
+
+
+def _version_key(test_id):
+    return f'paper_version:{test_id}'
+
+
+def content_version(test_id):
+    version = cache.get(_version_key(test_id))
+    if version is None:
+        version = time.time_ns()
+        cache.set(_version_key(test_id), version, None)
+    return version
+
+
+def invalidate(test_id):
+    """Called whenever a test or one of its questions changes."""
+    cache.set(_version_key(test_id), time.time_ns(), None)
+
+
+def is_randomized(test):
+    return bool(test.pool_size) or test.shuffle_choices
+
+
+def draw_questions(test, seed):
+    """Ids of the questions drawn for ``seed``, or ``None`` when the test shows its whole bank."""
+    if not test.pool_size:
+        return None
+    ids = list(Question.objects.filter(test_id=test.id).order_by('id').values_list('id', flat=True))
+    if test.pool_size >= len(ids):
+        return ids
+    # نجلب المعرفات فقط ثم نسحب منها، فلا نحمّل بنك الأسئلة كاملاً
+    return random.Random(seed).sample(ids, test.pool_size)
+
+
+def _build(test, seed, question_ids=None):
+    if question_ids is None:
+        question_ids = list(Question.objects.filter(test_id=test.id).order_by('id').values_list('id', flat=True))
+    questions = Question.objects.in_bulk(question_ids)
+
+    paper = []
+    for qid in question_ids:
+        q = questions.get(qid)
+        if q is None:
+            continue  # حُذف السؤال بعد بدء المحاولة
+        choices = [[number, text] for number, text in enumerate(q.get_choices(), start=1)]
+        if test.shuffle_choices:
+            # ترتيب كل سؤال من البذرة ورقمه فقط، فلا يتغير بإضافة أسئلة أخرى
+            random.Random(f'{seed}:{q.id}').shuffle(choices)
+        paper.append({
+            'id': q.id,
+            'text': q.text,
+            'image': q.image.url if q.image else '',
+            'image_name': q.image.name or '',
+            'choices': choices,
+        })
+    return paper
+
+
+def _paper_timeout():
+    # روابط الصور الموقّعة تنتهي، فلا نحتفظ بالورقة أطول من نصف عمرها
+    lifetime = storage.url_lifetime()
+    if lifetime is None:
+        return PAPER_TIMEOUT
+    return min(PAPER_TIMEOUT, lifetime // 2)
+
+
+def assemble_paper(test, seed, question_ids=None):
+    """Return the list of questions (with choices in display order) for ``seed``."""
+    if not is_randomized(test):
+        seed, question_ids = 0, None  # نفس الورقة لكل الطلاب، فنشاركها في الكاش
+    drawn = ''
+    if question_ids is not None:
+        drawn = hashlib.blake2b(','.join(map(str, question_ids)).encode(), digest_size=8).hexdigest()
+    cache_key = f'paper:{PAPER_FORMAT}:{test.id}:{seed}:{drawn}:{content_version(test.id)}'
+    paper = cache.get(cache_key)
+    if paper is None:
+        paper = _build(test, seed, question_ids)
+        cache.set(cache_key, paper, _paper_timeout())
+    return paper
+
+
+def paper_for(attempt, test):
+    """The attempt's paper; draws (and stores) its questions if it started before they were stored."""
+    if test.pool_size and attempt.question_ids is None:
+        attempt.question_ids = draw_questions(test, attempt.seed)
+        Attempt.objects.filter(pk=attempt.pk, question_ids__isnull=True).update(question_ids=attempt.question_ids)
+    return assemble_paper(test, attempt.seed, attempt.question_ids)
+
+
+def page_count(paper, page_size):
+    if not page_size:
+        return 1
+    return max((len(paper) + page_size - 1) // page_size, 1)
+
+
+def get_page(paper, page, page_size):
+    """Return ``(questions, start_number)`` for a 1-based page number."""
+    if not page_size:
+        return paper, 1
+    start = (page - 1) * page_size
+    return paper[start:start + page_size], start + 1
+
+
+def collect_answers(paper, data, previous=None):
+    """
+    Read the chosen option of each paper question from ``data`` (e.g. POST).
+
+    Questions missing from ``data`` keep their answer from ``previous`` (the
+    draft saved while paging through the test), or 0 if unanswered.
+    """
+    previous = previous or {}
+    answers = {}
+    for q in paper:
+        qid = str(q['id'])
+        if qid not in data:
+            answers[qid] = previous.get(qid, 0)
+            continue
+        try:
+            answers[qid] = int(data.get(qid))
+        except (TypeError, ValueError):
+            answers[qid] = 0
+    return answers
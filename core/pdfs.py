@@ -0,0 +1,101 @@
+"""
+Page previews and text extraction for lesson PDFs.
+
+``process_lesson_pdf`` (run by a background worker after a PDF is attached)
+renders every page to a small JPEG stored as a ``LessonPage`` and saves the
+PDF's text on ``Lesson.pdf_text`` for the search index.  The lesson page
+then shows the PDF one page image at a time instead of making students
+download the whole file.
+
+The PDF is opened from its file (a temporary local copy when media lives
+in a bucket), never read into memory, and each page's JPEG is written to
+storage as soon as it is rendered, so a scanned book of hundreds of pages
+needs memory for one page at a time.  Only the ``LessonPage`` rows are
+swapped in one transaction at the end.
+
+Rendering needs PyMuPDF (``pip install pymupdf``); without it lessons keep
+the plain download link.
+"""
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from . import search, storage
+from .models import Lesson, LessonPage
+
+try:
+    import pymupdf
+except ImportError:  # PyMuPDF اختياري (الإصدارات القديمة باسم fitz)
+    try:
+        import fitz as pymupdf
+    except ImportError:
+        pymupdf = None
+
+PAGE_WIDTH = 800
+JPEG_QUALITY = 70
+
+
+def available():
+    return pymupdf is not None
+
+
+def _render(page):
+    zoom = PAGE_WIDTH / page.rect.width
+    pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+    return pix.tobytes('jpeg', jpg_quality=JPEG_QUALITY), pix.width, pix.height
+
+
+@contextmanager
+def _local_path(field_file):
+    if storage.is_local():
+        yield field_file.path
+        return
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as tmp:
+        with field_file.open('rb') as f:
+            shutil.copyfileobj(f, tmp, length=1024 * 1024)
+        tmp.flush()
+        yield tmp.name
+
+
+def _store_image(lesson_id, number, image):
+    field = LessonPage._meta.get_field('image')
+    return field.storage.save(field.generate_filename(None, f'{lesson_id}-{number}.jpg'), ContentFile(image))
+
+
+def process_lesson_pdf(lesson_id):
+    """Rebuild the page previews and extracted text of a lesson's PDF."""
+    lesson = Lesson.objects.filter(pk=lesson_id).first()
+    if lesson is None:
+        return None
+    pdf_name = lesson.pdf_file.name or ''
+
+    pages, texts = [], []
+    if pdf_name:
+        if pymupdf is None:
+            return {'skipped': 'PyMuPDF is not installed'}
+        with _local_path(lesson.pdf_file) as path, pymupdf.open(path, filetype='pdf') as doc:
+            for number, page in enumerate(doc, start=1):
+                texts.append(page.get_text().strip())
+                image, width, height = _render(page)
+                # نحفظ الصورة فوراً ونحتفظ باسمها فقط؛ لو توقفت المهمة يحذفها gc_media --orphans
+                pages.append((number, _store_image(lesson_id, number, image), width, height))
+                del image
+    pdf_text = '\n\n'.join(t for t in texts if t)
+
+    with transaction.atomic():
+        # الملف تغيّر أثناء المعالجة: المهمة الأحدث ستتولاه
+        if not Lesson.objects.select_for_update().filter(pk=lesson_id, pdf_file=pdf_name).exists():
+            return {'skipped': 'pdf changed'}
+        # update() حتى لا نعيد تشغيل إشارات حفظ الدرس (وهذه المهمة معها)
+        Lesson.objects.filter(pk=lesson_id).update(pdf_text=pdf_text)
+        # الحذف والحفظ واحداً واحداً ليحدّث عدد مراجع الصور عبر الإشارات
+        LessonPage.objects.filter(lesson_id=lesson_id).delete()
+        for number, name, width, height in pages:
+            LessonPage(lesson_id=lesson_id, number=number, width=width, height=height, image=name).save()
+
+    lesson.pdf_text = pdf_text
+    search.index_lesson(lesson)
+    return {'pages': len(pages), 'chars': len(pdf_text)}
@@ -0,0 +1,189 @@
+"""
+Video watch progress.
+
+The lesson page sends a heartbeat every ``HEARTBEAT_SECONDS`` while the video
+plays (and once more when the page is left): the current position, the
+duration and every range watched since the page was opened.  Heartbeats are
+merged into a per-process buffer; the buffer is written with one batched
+upsert once it is ``PROGRESS_FLUSH_SECONDS`` old or holds
+``PROGRESS_FLUSH_SIZE`` students, so the database sees one write per student
+per flush instead of one per heartbeat.
+
+Watched ranges are unioned with what is already stored, and the browser
+always resends everything it watched, so heartbeats of one student landing
+on different worker processes (or a flush racing another) cannot lose
+progress for longer than the next heartbeat.  A crash loses at most one
+flush interval.
+"""
+import atexit
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import LessonProgress
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+MAX_RANGES = 200
+MAX_RAW_RANGES = 5000  # حد ما نقرؤه من طلب واحد قبل الدمج
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def merge_ranges(ranges):
+    """Sorted, non-overlapping union of ``[start, end]`` ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def cap_ranges(ranges, limit=MAX_RANGES):
+    """Keep the ``limit`` longest of merged ``ranges`` (in order): only tiny fragments are dropped."""
+    if len(ranges) <= limit:
+        return ranges
+    longest = sorted(ranges, key=lambda r: r[1] - r[0], reverse=True)[:limit]
+    return sorted(longest)
+
+
+def clean_ranges(ranges, duration):
+    """Ranges from the browser, validated, clamped to ``[0, duration]``, merged and capped."""
+    result = []
+    # ندمج قبل تطبيق الحد: المتصفح يرسل المقاطع بترتيب حدوثها، وقصّها أولاً يتجاهل كل ما شوهد بعد كثرة التنقل
+    for item in ranges[:MAX_RAW_RANGES] if isinstance(ranges, list) else ():
+        try:
+            start, end = float(item[0]), float(item[1])
+        except (TypeError, ValueError, IndexError):
+            continue
+        if duration:
+            start, end = min(start, duration), min(end, duration)
+        if 0 <= start < end:
+            result.append([round(start, 1), round(end, 1)])
+    return cap_ranges(merge_ranges(result))
+
+
+def summarize(ranges, duration):
+    """``(watched_seconds, percent, completed)`` for merged ranges."""
+    watched = sum(end - start for start, end in ranges)
+    if duration:
+        watched = min(watched, duration)
+        percent = min(100, round(100 * watched / duration))
+    else:
+        percent = 0
+    return watched, percent, percent >= _setting('LESSON_COMPLETE_PERCENT', 90)
+
+
+class Buffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._first_at = None
+        self._timer = None
+
+    def add(self, user_id, lesson_id, position, duration, ranges):
+        with self._lock:
+            item = self._pending.get((user_id, lesson_id))
+            if item is None:
+                self._pending[(user_id, lesson_id)] = {
+                    'position': position, 'duration': duration, 'ranges': merge_ranges(ranges),
+                }
+            else:
+                item['position'] = position
+                item['duration'] = max(item['duration'], duration)
+                item['ranges'] = merge_ranges(item['ranges'] + ranges)
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+                self._schedule()
+            due = (
+                len(self._pending) >= _setting('PROGRESS_FLUSH_SIZE', 200)
+                or time.monotonic() - self._first_at >= _setting('PROGRESS_FLUSH_SECONDS', 10)
+            )
+        if due:
+            self.flush()
+
+    def _schedule(self):
+        # يكتب المخزن المؤقت حتى لو توقفت النبضات (أغلق الطالب الصفحة)
+        self._timer = threading.Timer(_setting('PROGRESS_FLUSH_SECONDS', 10), self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Flushing lesson progress failed')
+        finally:
+            connection.close()
+
+    def take(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._first_at = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return pending
+
+    def flush(self):
+        """Write everything buffered with one read and one batched upsert."""
+        pending = self.take()
+        if pending:
+            save(pending)
+        return len(pending)
+
+
+def save(pending):
+    """Merge ``{(user_id, lesson_id): heartbeat}`` into ``LessonProgress``."""
+    user_ids = {user_id for user_id, _ in pending}
+    lesson_ids = {lesson_id for _, lesson_id in pending}
+    stored = {
+        (user_id, lesson_id): (duration, watched)
+        for user_id, lesson_id, duration, watched in LessonProgress.objects.filter(
+            user_id__in=user_ids, lesson_id__in=lesson_ids,
+        ).values_list('user_id', 'lesson_id', 'duration', 'watched')
+    }
+    now = timezone.now()
+    rows = []
+    for (user_id, lesson_id), item in pending.items():
+        old_duration, old_ranges = stored.get((user_id, lesson_id), (0, []))
+        duration = item['duration'] or old_duration
+        ranges = cap_ranges(merge_ranges((old_ranges or []) + item['ranges']))
+        watched_seconds, percent, completed = summarize(ranges, duration)
+        rows.append(LessonProgress(
+            user_id=user_id, lesson_id=lesson_id,
+            position=item['position'], duration=duration, watched=ranges,
+            watched_seconds=watched_seconds, percent=percent, completed=completed,
+            updated_at=now,
+        ))
+    LessonProgress.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user', 'lesson'],
+        update_fields=['position', 'duration', 'watched', 'watched_seconds', 'percent', 'completed', 'updated_at'],
+    )
+
+
+buffer = Buffer()
+atexit.register(buffer.flush)
+
+
+def record_heartbeat(user_id, lesson_id, position, duration, ranges):
+    try:
+        position, duration = max(0.0, float(position)), max(0.0, float(duration))
+    except (TypeError, ValueError):
+        return False
+    if not (math.isfinite(position) and math.isfinite(duration)):
+        return False
+    buffer.add(user_id, lesson_id, position, duration, clean_ranges(ranges, duration))
+    return True
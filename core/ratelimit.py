@@ -0,0 +1,116 @@
+"""
+Rate limiting for the login, registration and password-reset views.
+
+Each (scope, username) pair gets ``N`` requests per period
+(``settings.RATELIMITS``, e.g. ``'10/m'``); that is what stops guessing one
+account's password.  Each (scope, client IP) pair gets a much looser limit
+(``settings.RATELIMITS_PER_IP``, e.g. ``'300/m'``): a whole classroom behind
+one school NAT logs in from the same address, so the IP bucket only has to
+stop a single script hammering the site.  When a limit is hit the view is
+not called at all and a 429 with ``Retry-After`` is returned, so a scripted
+client cannot keep the workers busy hashing passwords.
+
+Counters are fixed windows in the default cache, created with ``add`` and
+bumped with ``incr``.  That is atomic on memcached/redis; the file cache
+implements ``incr`` as read-then-write, so there every process takes an
+exclusive lock on a file in the cache directory around it (where ``fcntl``
+exists; on Windows dev machines it is left unlocked).
+"""
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+DEFAULT_RATE = '10/m'
+DEFAULT_IP_RATE = '300/m'
+_PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """``'10/m'`` -> ``(10, 60)``."""
+    count, _, period = rate.partition('/')
+    return int(count), _PERIODS[period.strip().lower()[:1]]
+
+
+def client_ip(request):
+    if getattr(settings, 'RATELIMIT_TRUST_X_FORWARDED_FOR', False):
+        # آخر عنوان في السلسلة هو ما أضافه البروكسي الخاص بنا، وما قبله يحدده العميل
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+@contextmanager
+def _counter_lock():
+    cache_dir = getattr(cache, '_dir', None)
+    if fcntl is None or cache_dir is None:
+        # memcached/redis: incr ذري بالفعل
+        yield
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, 'ratelimit.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def hit(key, capacity, period):
+    """Count one request against ``key``; return 0 or the seconds to wait."""
+    now = time.time()
+    key = f'{key}:{int(now // period)}'
+    with _counter_lock():
+        cache.add(key, 0, period)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # انتهت صلاحية المفتاح بين add و incr
+            cache.set(key, 1, period)
+            count = 1
+    if count > capacity:
+        return max(int(period - now % period), 1)
+    return 0
+
+
+def _request_limits(request, scope, key_func):
+    ip_rate = getattr(settings, 'RATELIMITS_PER_IP', {}).get(scope, DEFAULT_IP_RATE)
+    limits = [(f'ratelimit:{scope}:ip:{client_ip(request)}', ip_rate)]
+    identity = key_func(request) if key_func else request.POST.get('username', '')
+    if identity:
+        rate = getattr(settings, 'RATELIMITS', {}).get(scope, DEFAULT_RATE)
+        limits.append((f'ratelimit:{scope}:user:{str(identity).strip().lower()}', rate))
+    return limits
+
+
+def ratelimit(scope, key_func=None, methods=('POST',)):
+    """
+    Limit a view per username (the ``username`` POST field, or whatever
+    ``key_func(request)`` returns) and, more loosely, per client IP.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods and getattr(settings, 'RATELIMIT_ENABLE', True):
+                wait = max(hit(key, *parse_rate(rate)) for key, rate in _request_limits(request, scope, key_func))
+                if wait:
+                    response = HttpResponse(
+                        'محاولات كثيرة جداً، يرجى الانتظار قليلاً ثم المحاولة مرة أخرى.',
+                        status=429,
+                        content_type='text/plain; charset=utf-8',
+                    )
+                    response['Retry-After'] = str(wait)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,101 @@
+"""
+Review snapshots of completed attempts.
+
+When an attempt is submitted, ``take_test`` stores what the student actually
+saw on ``Attempt.review_snapshot``: each question's text, image, choices in
+display order, the chosen and the correct choice number.  ``review_answers``
+renders from that single row, so editing a question later does not change
+past reviews, and nothing is re-queried or re-parsed.
+
+Only the grading side moves after submission: a regrade or an admin edit of
+the answers rewrites ``correct`` / ``chosen`` in the snapshot so it always
+matches ``Attempt.score``.
+
+Snapshot format (``SNAPSHOT_VERSION``)::
+
+    {"v": 1, "questions": [
+        {"id": 7, "text": "...", "image": "questions/ab/ab12....png",
+         "choices": [[2, "..."], [1, "..."], ...], "chosen": 2, "correct": 1},
+    ]}
+"""
+from .models import Question
+from .storage import media_storage
+
+SNAPSHOT_VERSION = 1
+
+
+def _as_choice(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_snapshot(paper, answers, key):
+    """Snapshot for ``answers`` given on ``paper`` (see ``papers.assemble_paper``)."""
+    questions = []
+    for q in paper:
+        qid = str(q['id'])
+        questions.append({
+            'id': q['id'],
+            'text': q['text'],
+            'image': q.get('image_name', ''),
+            'choices': q['choices'],
+            'chosen': _as_choice(answers.get(qid)),
+            'correct': key.get(qid, 0),
+        })
+    return {'v': SNAPSHOT_VERSION, 'questions': questions}
+
+
+def legacy_snapshot(attempt, key):
+    """Best-effort snapshot for attempts completed before snapshots existed."""
+    answers = attempt.answers or {}
+    questions = Question.objects.filter(test_id=attempt.test_id, id__in=[int(qid) for qid in answers])
+    paper = [
+        {
+            'id': q.id,
+            'text': q.text,
+            'image_name': q.image.name or '',
+            'choices': [[n, text] for n, text in enumerate(q.get_choices(), start=1)],
+        }
+        for q in questions.order_by('id')
+    ]
+    return build_snapshot(paper, answers, key)
+
+
+def is_current(snapshot):
+    return bool(snapshot) and snapshot.get('v') == SNAPSHOT_VERSION
+
+
+def apply_key(snapshot, key):
+    """Update the correct answers after a regrade; return whether anything changed."""
+    changed = False
+    for q in snapshot['questions']:
+        correct = key.get(str(q['id']))
+        if correct is not None and correct != q['correct']:
+            q['correct'] = correct
+            changed = True
+    return changed
+
+
+def apply_answers(snapshot, answers):
+    """Update the chosen answers after an admin edit of ``Attempt.answers``."""
+    for q in snapshot['questions']:
+        q['chosen'] = _as_choice(answers.get(str(q['id'])))
+
+
+def rows(snapshot):
+    """Template rows: the snapshot questions plus resolved texts and image URL."""
+    storage = media_storage()
+    result = []
+    for q in snapshot['questions']:
+        texts = dict(q['choices'])
+        result.append({
+            'text': q['text'],
+            'image_url': storage.url(q['image']) if q['image'] else '',
+            'chosen': q['chosen'],
+            'chosen_text': texts.get(q['chosen'], ''),
+            'correct_text': texts.get(q['correct'], ''),
+            'is_correct': q['chosen'] > 0 and q['chosen'] == q['correct'],
+        })
+    return result
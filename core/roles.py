@@ -0,0 +1,41 @@
+"""
+User roles.
+
+Every user has a ``Profile`` (created by a ``post_save`` signal on
+``User``), and its role is cached per user so permission checks on each
+request are a cache hit instead of a query.  The cache entry is dropped
+whenever the profile is saved or deleted.
+"""
+from django.core.cache import cache
+
+from .models import Profile
+
+ROLE_TIMEOUT = 60 * 60
+
+
+def _cache_key(user_id):
+    return f'user_role:{user_id}'
+
+
+def get_role(user):
+    if not user.is_authenticated:
+        return None
+    role = getattr(user, '_cached_role', None)
+    if role is None:
+        role = cache.get(_cache_key(user.pk))
+        if role is None:
+            role = Profile.objects.filter(user_id=user.pk).values_list('role', flat=True).first() or 'student'
+            cache.set(_cache_key(user.pk), role, ROLE_TIMEOUT)
+        user._cached_role = role  # مرة واحدة لكل طلب
+    return role
+
+
+def invalidate_role(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def is_admin(user):
+    """Helper function to check if a user has admin privileges."""
+    if not user.is_authenticated:
+        return False
+    return user.is_superuser or user.is_staff or get_role(user) == 'admin'
@@ -0,0 +1,229 @@
+"""
+Full-text search over lessons and questions.
+
+The index lives in its own table (``core_search_index``) and is kept up to
+date from model signals (see ``core/signals.py``).  On SQLite it is an FTS5
+virtual table ranked with ``bm25``; on PostgreSQL it is a plain table with a
+GIN-indexed ``tsvector`` column ranked with ``ts_rank``.  Both the indexed
+text and the query go through ``normalize_arabic`` so that diacritics and
+alef / ya / ta-marbuta spelling variants match each other, and the definite
+article is dropped from each word.
+"""
+import re
+
+from django.db import connection
+
+INDEX_TABLE = 'core_search_index'
+
+KIND_LESSON = 'lesson'
+KIND_QUESTION = 'question'
+_KIND_CODES = {KIND_LESSON: 0, KIND_QUESTION: 1}
+
+# التشكيل + التطويل (ـ)
+_DIACRITICS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_FOLD_TABLE = str.maketrans({
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627', '\u0671': '\u0627',  # أ إ آ ٱ -> ا
+    '\u0649': '\u064a', '\u0626': '\u064a',  # ى ئ -> ي
+    '\u0629': '\u0647',  # ة -> ه
+    '\u0624': '\u0648',  # ؤ -> و
+})
+_TOKEN_RE = re.compile(r'\w+')
+# أداة التعريف وما يسبقها من حروف العطف والجر (ال، وال، بال، كال، فال، لل)
+_ARTICLE_RE = re.compile('^(?:[\u0648\u0628\u0643\u0641]?\u0627\u0644|\u0644\u0644)(?=..)')
+
+
+def normalize_arabic(text):
+    """Strip diacritics/tatweel and fold alef, ya and ta-marbuta variants."""
+    if not text:
+        return ''
+    text = _DIACRITICS_RE.sub('', text)
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def _tokens(text):
+    return [_ARTICLE_RE.sub('', t) for t in _TOKEN_RE.findall(normalize_arabic(text))]
+
+
+def _index_text(text):
+    return ' '.join(_tokens(text))
+
+
+# --- Schema ---
+
+def create_index(schema_editor=None):
+    """Create the index table for the current database backend."""
+    conn = schema_editor.connection if schema_editor else connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+                " kind varchar(16) NOT NULL,"
+                " object_id bigint NOT NULL,"
+                " lesson_id bigint NOT NULL,"
+                " title text NOT NULL,"
+                " body text NOT NULL,"
+                " document tsvector NOT NULL,"
+                " PRIMARY KEY (kind, object_id))"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_document "
+                f"ON {INDEX_TABLE} USING GIN (document)"
+            )
+        else:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} USING fts5("
+                " kind UNINDEXED, object_id UNINDEXED, lesson_id UNINDEXED,"
+                " title, body, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+
+def drop_index(schema_editor=None):
+    conn = schema_editor.connection if schema_editor else connection
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+
+# --- Index maintenance ---
+
+def _rowid(kind, object_id):
+    # FTS5 لا يدعم فهارس على الأعمدة، لذلك نرمّز (النوع، المعرّف) في rowid
+    # حتى يكون الحذف والتحديث بحثًا مباشرًا وليس مسحًا للجدول
+    return object_id * len(_KIND_CODES) + _KIND_CODES[kind]
+
+
+def _remove(cursor, kind, object_id):
+    if connection.vendor == 'postgresql':
+        cursor.execute(
+            f"DELETE FROM {INDEX_TABLE} WHERE kind = %s AND object_id = %s",
+            [kind, object_id],
+        )
+    else:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE} WHERE rowid = %s", [_rowid(kind, object_id)])
+
+
+def _upsert(kind, object_id, lesson_id, title, body):
+    title = _index_text(title)
+    body = _index_text(body)
+    with connection.cursor() as cursor:
+        _remove(cursor, kind, object_id)
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE} (kind, object_id, lesson_id, title, body, document) "
+                "VALUES (%s, %s, %s, %s, %s, "
+                "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B'))",
+                [kind, object_id, lesson_id, title, body, title, body],
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE} (rowid, kind, object_id, lesson_id, title, body) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [_rowid(kind, object_id), kind, object_id, lesson_id, title, body],
+            )
+
+
+def lesson_document(lesson):
+    """Searchable text of a lesson: its content plus the text of its PDF."""
+    # getattr: الموديلات التاريخية في الهجرات القديمة لا تملك pdf_text
+    return '\n'.join(part for part in (lesson.content, getattr(lesson, 'pdf_text', '')) if part)
+
+
+def question_document(question):
+    """Searchable text of a question: its text plus the choices."""
+    return f"{question.text or ''} {question.choices or ''}"
+
+
+def index_lesson(lesson):
+    _upsert(KIND_LESSON, lesson.pk, lesson.pk, lesson.title, lesson_document(lesson))
+
+
+def index_question(question):
+    lesson_id = question.test.lesson_id
+    _upsert(KIND_QUESTION, question.pk, lesson_id, '', question_document(question))
+
+
+def remove_lesson(lesson_id):
+    with connection.cursor() as cursor:
+        _remove(cursor, KIND_LESSON, lesson_id)
+
+
+def remove_question(question_id):
+    with connection.cursor() as cursor:
+        _remove(cursor, KIND_QUESTION, question_id)
+
+
+def rebuild_index(lessons, questions):
+    """Drop every entry and re-index the given querysets. Returns the count."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+    count = 0
+    for lesson in lessons.iterator(chunk_size=500):
+        index_lesson(lesson)
+        count += 1
+    for question in questions.select_related('test').iterator(chunk_size=500):
+        index_question(question)
+        count += 1
+    return count
+
+
+# --- Querying ---
+
+def _fts5_query(tokens):
+    # كل كلمة كعبارة مقتبسة مع بحث بالبادئة، والكلمات مربوطة بـ AND ضمنيًا
+    return ' '.join(f'"{t}"*' for t in tokens)
+
+
+def search(query, include_questions=False, include_hidden=False, limit=20, offset=0):
+    """
+    Ranked search. Returns a list of dicts with ``kind``, ``object_id``,
+    ``lesson_id``, ``lesson_title`` and ``snippet``.
+
+    Hidden lessons (and their questions) are excluded unless
+    ``include_hidden`` is set.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    kinds = [KIND_LESSON, KIND_QUESTION] if include_questions else [KIND_LESSON]
+    kind_placeholders = ', '.join(['%s'] * len(kinds))
+    hidden_clause = '' if include_hidden else 'AND l.is_hidden = %s'
+    hidden_params = [] if include_hidden else [False]
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            "SELECT s.kind, s.object_id, s.lesson_id, l.title, "
+            "ts_headline('simple', s.body, q, 'MaxWords=20, MinWords=5') "
+            f"FROM {INDEX_TABLE} s "
+            "JOIN core_lesson l ON l.id = s.lesson_id, "
+            "to_tsquery('simple', %s) q "
+            f"WHERE s.document @@ q AND s.kind IN ({kind_placeholders}) {hidden_clause} "
+            "ORDER BY ts_rank(s.document, q) DESC "
+            "LIMIT %s OFFSET %s"
+        )
+        params = [' & '.join(f'{t}:*' for t in tokens), *kinds, *hidden_params, limit, offset]
+    else:
+        sql = (
+            f"SELECT t.kind, t.object_id, t.lesson_id, l.title, "
+            f"snippet({INDEX_TABLE}, 4, '', '', '…', 12) "
+            f"FROM {INDEX_TABLE} t "
+            "JOIN core_lesson l ON l.id = t.lesson_id "
+            f"WHERE {INDEX_TABLE} MATCH %s AND t.kind IN ({kind_placeholders}) {hidden_clause} "
+            f"ORDER BY bm25({INDEX_TABLE}, 0.0, 0.0, 0.0, 10.0, 1.0) "
+            "LIMIT %s OFFSET %s"
+        )
+        params = [_fts5_query(tokens), *kinds, *hidden_params, limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'kind': kind,
+            'object_id': int(object_id),
+            'lesson_id': int(lesson_id),
+            'lesson_title': lesson_title,
+            'snippet': snippet,
+        }
+        for kind, object_id, lesson_id, lesson_title, snippet in rows
+    ]
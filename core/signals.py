@@ -0,0 +1,130 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import grading, notifications, papers, roles, search, storage, tasks
+from .models import Lesson, LessonPage, Profile, Question, Test
+
+
+# --- Profiles and roles ---
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    # كل مستخدم له ملف شخصي (التسجيل، لوحة الإدارة، createsuperuser...)
+    if created and not raw:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_role(sender, instance, **kwargs):
+    roles.invalidate_role(instance.user_id)
+
+
+# --- Search index ---
+
+@receiver(post_save, sender=Lesson)
+def index_lesson_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_lesson(instance)
+
+
+@receiver(post_delete, sender=Lesson)
+def unindex_lesson_on_delete(sender, instance, **kwargs):
+    search.remove_lesson(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def index_question_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_question(instance)
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question_on_delete(sender, instance, **kwargs):
+    search.remove_question(instance.pk)
+
+
+# --- Answer key and paper caches ---
+
+@receiver(pre_save, sender=Question)
+def remember_test(sender, instance, raw=False, **kwargs):
+    instance._old_test_id = None
+    if not raw and instance.pk is not None:
+        instance._old_test_id = sender.objects.filter(pk=instance.pk).values_list('test_id', flat=True).first()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_answer_key(sender, instance, **kwargs):
+    # سؤال نُقل إلى اختبار آخر يغيّر مفتاح الإجابات وأوراق الاختبارين
+    test_ids = {instance.test_id, getattr(instance, '_old_test_id', None)} - {None}
+    for test_id in test_ids:
+        grading.invalidate_answer_key(test_id)
+        papers.invalidate(test_id)
+
+
+@receiver(post_save, sender=Test)
+def invalidate_papers(sender, instance, **kwargs):
+    papers.invalidate(instance.pk)
+
+
+# --- Media reference counts ---
+
+def _media_names(instance):
+    fields = storage.MEDIA_FIELDS[type(instance).__name__]
+    return {field: getattr(instance, field).name or '' for field in fields}
+
+
+@receiver(pre_save, sender=Lesson)
+@receiver(pre_save, sender=Question)
+@receiver(pre_save, sender=LessonPage)
+def remember_media(sender, instance, raw=False, **kwargs):
+    instance._old_media = {}
+    if raw or instance.pk is None:
+        return
+    fields = storage.MEDIA_FIELDS[sender.__name__]
+    instance._old_media = sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=LessonPage)
+def count_media_refs(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_old_media', None) or {}
+    for field, name in _media_names(instance).items():
+        previous = old.get(field) or ''
+        if name != previous:
+            storage.incref(name)
+            storage.decref(previous)
+
+
+@receiver(post_delete, sender=Lesson)
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=LessonPage)
+def release_media(sender, instance, **kwargs):
+    for name in _media_names(instance).values():
+        storage.decref(name)
+
+
+# --- PDF previews ---
+
+@receiver(post_save, sender=Lesson)
+def process_new_pdf(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_old_media', None) or {}
+    if (instance.pdf_file.name or '') != (old.get('pdf_file') or ''):
+        lesson_id = instance.pk
+        transaction.on_commit(lambda: tasks.enqueue(tasks.process_lesson_pdf, lesson_id))
+
+
+# --- Email notifications ---
+
+@receiver(post_save, sender=Lesson)
+def announce_new_lesson(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not instance.is_hidden:
+        transaction.on_commit(lambda: notifications.notify_new_lesson(instance))
@@ -0,0 +1,245 @@
+"""
+Content-addressed media storage.
+
+Uploaded files are stored once under their SHA-256 digest
+(``questions/ab/ab12...ef.jpg``), so uploading the same screenshot or video
+again reuses the existing blob instead of writing a copy.  ``MediaBlob``
+rows count how many ``Lesson``/``Question`` fields point at each blob (kept
+up to date from signals in ``core/signals.py``); ``manage.py gc_media``
+deletes blobs nobody references any more.
+
+Because a name always maps to the same bytes, these files can be cached by
+browsers forever.
+
+``settings.MEDIA_STORAGE`` picks where the blobs live: ``'local'`` keeps
+them under ``MEDIA_ROOT``; ``'s3'`` puts them in an S3-compatible bucket
+(AWS, MinIO, ...) through ``django-storages`` so several app servers can
+share them.  Remote files are handed out as short-lived signed URLs.
+"""
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+
+HASH_CHUNK = 1024 * 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+_CAS_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.[\w]+)?$')
+
+# حقول الملفات التي نتتبع مراجعها: (اسم الموديل، الحقول)
+MEDIA_FIELDS = {
+    'Lesson': ('video_file', 'pdf_file'),
+    'Question': ('image',),
+    'LessonPage': ('image',),
+}
+
+
+def is_content_addressed(name):
+    return bool(_CAS_NAME_RE.search(name or ''))
+
+
+def content_name(directory, digest, ext):
+    return os.path.join(directory, digest[:2], digest + ext.lower()).replace('\\', '/')
+
+
+def content_root(name):
+    """Directory a file belongs in: ``questions/ab/<hash>.jpg`` and ``questions/x.jpg`` both give ``questions``."""
+    directory = os.path.dirname(name)
+    if is_content_addressed(name):
+        # حفظ ملف باسمه الحالي (مثل تصغير صورة السؤال) لا يضيف مستوى آخر
+        directory = os.path.dirname(directory)
+    return directory
+
+
+class ContentAddressedMixin:
+    """Storage mixin that names every file after its SHA-256 digest."""
+
+    def get_available_name(self, name, max_length=None):
+        # الاسم النهائي يُحسب من المحتوى في _save، ونفس الاسم = نفس المحتوى
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK):
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        name = content_name(content_root(name), digest.hexdigest(), os.path.splitext(name)[1])
+        # نجدد الـ blob قبل exists: gc_media لا يحذف ملفاً تغيّر بعد بداية مهلته، فلا
+        # يختفي الملف بين إرجاع اسمه هنا وزيادة عدد مراجعه في إشارة post_save
+        touch(name)
+        if self.exists(name):
+            return name
+        return self.store(name, content)
+
+    def store(self, name, content):
+        """Write ``content`` under an already computed content-addressed ``name``."""
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            # رفع متزامن لنفس المحتوى
+            return name
+
+
+class ContentAddressedStorage(ContentAddressedMixin, FileSystemStorage):
+    pass
+
+
+def _s3_storage():
+    try:
+        from storages.backends.s3 import S3Storage
+    except ImportError:
+        raise ImproperlyConfigured(
+            "MEDIA_STORAGE='s3' needs django-storages and boto3: pip install django-storages boto3"
+        )
+
+    class S3ContentAddressedStorage(ContentAddressedMixin, S3Storage):
+        pass
+
+    return S3ContentAddressedStorage(
+        file_overwrite=True,
+        object_parameters={'CacheControl': IMMUTABLE_CACHE_CONTROL},
+    )
+
+
+_media_storage = None
+
+
+def media_storage():
+    """Storage used by the lesson and question file fields."""
+    global _media_storage
+    if _media_storage is None:
+        backend = getattr(settings, 'MEDIA_STORAGE', 'local')
+        if backend == 's3':
+            _media_storage = _s3_storage()
+        elif backend == 'local':
+            _media_storage = ContentAddressedStorage()
+        else:
+            raise ImproperlyConfigured(f"Unknown MEDIA_STORAGE {backend!r} (use 'local' or 's3')")
+    return _media_storage
+
+
+def is_local():
+    """Whether media files have a path on this machine's disk."""
+    return isinstance(media_storage(), FileSystemStorage)
+
+
+def url_lifetime():
+    """Seconds a URL from ``FieldFile.url`` stays valid (``None`` = forever)."""
+    if is_local():
+        return None
+    return getattr(settings, 'AWS_QUERYSTRING_EXPIRE', 3600)
+
+
+def signed_url(name, expire=None):
+    """A short-lived URL for ``name`` on remote storage."""
+    if expire is None:
+        expire = getattr(settings, 'MEDIA_SIGNED_URL_EXPIRE', 300)
+    return media_storage().url(name, expire=expire)
+
+
+# --- Reference counting ---
+
+def incref(name):
+    from .models import MediaBlob
+
+    if not name:
+        return
+    MediaBlob.objects.get_or_create(name=name)
+    MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=timezone.now())
+
+
+def touch(name):
+    from .models import MediaBlob
+
+    MediaBlob.objects.filter(name=name).update(updated_at=timezone.now())
+
+
+def decref(name):
+    from .models import MediaBlob
+
+    if not name:
+        return
+    MediaBlob.objects.filter(name=name).update(refcount=F('refcount') - 1, updated_at=timezone.now())
+
+
+def referenced_names():
+    """Count every file name referenced by a media field: ``{name: refs}``."""
+    from django.apps import apps
+
+    counts = {}
+    for model_name, fields in MEDIA_FIELDS.items():
+        model = apps.get_model('core', model_name)
+        for row in model.objects.values_list(*fields).iterator():
+            for name in row:
+                if name:
+                    counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def recount():
+    """Rebuild every ``MediaBlob.refcount`` from the model fields."""
+    from .models import MediaBlob
+
+    counts = referenced_names()
+    now = timezone.now()
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name) for name in counts],
+        ignore_conflicts=True,
+    )
+    blobs = list(MediaBlob.objects.all())
+    changed = []
+    for blob in blobs:
+        refcount = counts.get(blob.name, 0)
+        if blob.refcount != refcount:
+            blob.refcount = refcount
+            blob.updated_at = now
+            changed.append(blob)
+    MediaBlob.objects.bulk_update(changed, ['refcount', 'updated_at'])
+    return len(changed)
+
+
+def _walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        yield f'{directory}/{filename}'
+    for sub in directories:
+        yield from _walk(storage, f'{directory}/{sub}')
+
+
+def find_orphans(directories):
+    """Files under ``directories`` that no field or blob knows about."""
+    from .models import MediaBlob
+
+    known = set(MediaBlob.objects.values_list('name', flat=True))
+    known.update(referenced_names())
+    media = media_storage()
+    for directory in directories:
+        if is_local() and not media.exists(directory):
+            continue
+        for name in _walk(media, directory):
+            if name not in known:
+                yield name
+
+
+def collect_garbage(grace, dry_run=False):
+    """Delete blobs whose refcount dropped to zero more than ``grace`` ago."""
+    from .models import MediaBlob
+
+    cutoff = timezone.now() - grace
+    deleted = []
+    for blob in MediaBlob.objects.filter(refcount__lte=0, updated_at__lt=cutoff).iterator():
+        deleted.append(blob.name)
+        if dry_run:
+            continue
+        # نعيد التحقق داخل الحذف: قد يكون أحدهم أضاف مرجعاً أو أعاد رفع نفس المحتوى بعد القراءة
+        if MediaBlob.objects.filter(pk=blob.pk, refcount__lte=0, updated_at__lt=cutoff).delete()[0]:
+            media_storage().delete(blob.name)
+    return deleted
@@ -0,0 +1,251 @@
+"""
+A small database-backed task queue.
+
+Views call ``enqueue()`` and return immediately; ``manage.py run_workers``
+starts worker processes that claim pending rows from ``core_task``, run the
+registered function and record the result.  Failed tasks are retried with
+exponential backoff until ``max_attempts`` is reached.
+"""
+import io
+import logging
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import DatabaseError, close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from . import analytics, enrollment, exports, grading, leaderboard, pdfs, storage, uploads
+from .models import Task, Upload
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 5  # ثواني، تتضاعف مع كل محاولة
+HEARTBEAT_SECONDS = 30
+# المهمة الجارية تحدّث updated_at كل HEARTBEAT_SECONDS، فتوقفها هذه المدة يعني أن عاملها مات
+STALE_AFTER = timedelta(seconds=HEARTBEAT_SECONDS * 5)
+REQUEUE_EVERY = 60  # ثواني
+CLAIM_BATCH = 10
+
+_registry = {}
+
+
+def task(func):
+    """Register ``func`` so workers can run it by name."""
+    _registry[func.__name__] = func
+    return func
+
+
+def enqueue(func, *args, delay=0, max_attempts=3):
+    """Queue ``func(*args)``. ``args`` must be JSON serialisable."""
+    name = func if isinstance(func, str) else func.__name__
+    if name not in _registry:
+        raise ValueError(f"Unknown task: {name}")
+    return Task.objects.create(
+        name=name,
+        args=list(args),
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim_next():
+    """Atomically move one due task to ``running`` and return it (or None)."""
+    now = timezone.now()
+    candidates = (
+        Task.objects.filter(status='pending', run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:CLAIM_BATCH]
+    )
+    for task_id in candidates:
+        # compare-and-set: worker آخر قد يكون أخذ المهمة قبلنا
+        claimed = Task.objects.filter(id=task_id, status='pending').update(
+            status='running', attempts=F('attempts') + 1, updated_at=now,
+        )
+        if claimed:
+            return Task.objects.get(id=task_id)
+    return None
+
+
+@contextmanager
+def heartbeat(task_id):
+    """Keep ``updated_at`` of a running task fresh so ``requeue_stale`` leaves it alone."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    Task.objects.filter(pk=task_id, status='running').update(updated_at=timezone.now())
+                except DatabaseError:
+                    logger.warning("Heartbeat for task #%s failed", task_id, exc_info=True)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'task-{task_id}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_task(task_obj):
+    func = _registry.get(task_obj.name)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task: {task_obj.name}")
+        with heartbeat(task_obj.pk):
+            result = func(*task_obj.args)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Task %s failed (attempt %s)", task_obj, task_obj.attempts)
+        if task_obj.attempts >= task_obj.max_attempts:
+            task_obj.status = 'failed'
+        else:
+            task_obj.status = 'pending'
+            delay = RETRY_BASE_DELAY * 2 ** (task_obj.attempts - 1)
+            task_obj.run_after = timezone.now() + timedelta(seconds=delay)
+        task_obj.last_error = error
+        task_obj.save(update_fields=['status', 'run_after', 'last_error', 'updated_at'])
+        return False
+
+    task_obj.status = 'done'
+    task_obj.result = result
+    task_obj.last_error = ''
+    task_obj.save(update_fields=['status', 'result', 'last_error', 'updated_at'])
+    return True
+
+
+def requeue_stale():
+    """Return tasks whose worker stopped sending heartbeats (it crashed) to the queue."""
+    return Task.objects.filter(
+        status='running', updated_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status='pending', run_after=timezone.now())
+
+
+def work(stop_event=None, poll_interval=1.0, once=False):
+    """Worker loop. With ``once`` it exits as soon as the queue is empty."""
+    processed = 0
+    next_requeue = 0
+    while not (stop_event and stop_event.is_set()):
+        close_old_connections()
+        if time.monotonic() >= next_requeue:
+            # عامل مات أثناء مهمة في أي عملية أخرى: نعيدها للطابور دون انتظار إعادة تشغيل run_workers
+            requeue_stale()
+            next_requeue = time.monotonic() + REQUEUE_EVERY
+        task_obj = claim_next()
+        if task_obj is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_task(task_obj)
+        processed += 1
+    return processed
+
+
+# --- Tasks ---
+
+@task
+def regrade_test(test_id):
+    result = grading.regrade_test(test_id)
+    # تغيّر مفتاح الإجابات يغيّر إحصائيات الأسئلة حتى لو لم تتغير الدرجات
+    analytics.rebuild_test_stats(test_id)
+    leaderboard.rebuild_test(test_id)
+    return result
+
+
+@task
+def record_attempt_stats(attempt_id):
+    return analytics.record_attempt(attempt_id)
+
+
+@task
+def rebuild_test_stats(test_id):
+    return analytics.rebuild_test_stats(test_id)
+
+
+QUESTION_IMAGE_MAX_WIDTH = 1280
+
+
+@task
+def resize_question_image(question_id):
+    """Downscale a large question image so exam pages stay light."""
+    from PIL import Image
+
+    from .models import Question
+
+    question = Question.objects.filter(pk=question_id).first()
+    if question is None or not question.image:
+        return None
+
+    with question.image.open('rb') as f:
+        img = Image.open(f)
+        img.load()
+    if img.width <= QUESTION_IMAGE_MAX_WIDTH:
+        return {'resized': False}
+
+    fmt = img.format or 'JPEG'
+    height = round(img.height * QUESTION_IMAGE_MAX_WIDTH / img.width)
+    img = img.resize((QUESTION_IMAGE_MAX_WIDTH, height), Image.LANCZOS)
+    if fmt == 'JPEG' and img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, optimize=True)
+
+    old_name = question.image.name
+    new_name = question.image.storage.save(old_name, ContentFile(buf.getvalue()))
+    # update() بدل save() حتى لا نعيد تشغيل الإشارات وفهرسة السؤال، لذلك
+    # نعدّل عدد المراجع يدوياً ونترك حذف الملف القديم لـ gc_media
+    if new_name != old_name:
+        if Question.objects.filter(pk=question_id, image=old_name).update(image=new_name):
+            storage.incref(new_name)
+            storage.decref(old_name)
+    return {'resized': True, 'name': os.path.basename(new_name)}
+
+
+@task
+def process_lesson_pdf(lesson_id):
+    return pdfs.process_lesson_pdf(lesson_id)
+
+
+@task
+def finalize_upload(upload_id):
+    upload = Upload.objects.filter(pk=upload_id, completed=False).select_related('lesson').first()
+    if upload is None or upload.offset != upload.size:
+        return None
+    try:
+        uploads.complete(upload)
+    except uploads.UploadError as e:
+        # ليس خطأ مؤقتاً: الملف تالف ويجب رفعه من جديد، فلا نعيد المحاولة
+        return {'error': str(e)}
+    return {'path': upload.path}
+
+
+@task
+def export_attempts_parquet(test_id=None):
+    return exports.save_parquet(test_id)
+
+
+@task
+def import_students_file(path):
+    """
+    Import a roster uploaded from the dashboard, then delete it (it holds
+    passwords) whether or not the import worked.  Queued with
+    ``max_attempts=1``: a file that failed once fails again, and it must not
+    stay on disk waiting for retries.
+    """
+    try:
+        return enrollment.import_roster_file(path)
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
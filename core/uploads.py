@@ -0,0 +1,222 @@
+"""
+Resumable, chunked uploads for large lesson videos and PDFs.
+
+The client creates an ``Upload`` and then sends the file in ranged ``PUT``
+requests (``Content-Range: bytes start-end/total``).  Every chunk is
+streamed from the request straight into a staging file under
+``PRIVATE_UPLOAD_ROOT/uploads`` at its offset, so nothing is buffered in
+memory or copied through ``/tmp`` and an unverified file is never
+reachable through the media URLs.  A chunk may carry an
+``Upload-Checksum: sha256 <base64>`` header; a chunk that fails it does not
+advance the offset and can simply be re-sent.  The request that writes the
+last byte only queues ``tasks.finalize_upload``; the worker hashes the
+whole file, checks it against the optional expected checksum, moves it to
+its content-addressed name in media storage (see ``core/storage.py``) and
+attaches it to the lesson, so a multi-GB file is never re-read inside a
+request.  Until then the upload reports ``processing``; a failed check
+resets the offset to 0 and sets ``error``.
+
+Parts are always assembled on this server's disk; with remote media storage
+the finished file is uploaded to the bucket once, so a resumable upload
+must keep talking to the same app server (sticky sessions or a shared
+``PRIVATE_UPLOAD_ROOT``).
+"""
+import base64
+import hashlib
+import os
+import re
+import shutil
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.utils.text import get_valid_filename
+
+from . import storage
+from .models import Upload
+
+UPLOAD_DIRS = {'video_file': 'videos/', 'pdf_file': 'pdfs/'}
+COPY_BUFFER = 1024 * 1024
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def max_upload_size():
+    return getattr(settings, 'LESSON_UPLOAD_MAX_SIZE', 8 * 1024 ** 3)
+
+
+def staging_root():
+    return os.path.join(settings.PRIVATE_UPLOAD_ROOT, 'uploads')
+
+
+def staging_path(upload):
+    """Where the parts of an unfinished upload are assembled."""
+    return os.path.join(staging_root(), upload.path)
+
+
+def _reserve(name):
+    """Create an empty staging file for ``name`` (or a free variant of it) and return its name."""
+    staging = FileSystemStorage(location=staging_root())
+    while True:
+        name = staging.get_available_name(name)
+        path = staging.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            # إنشاء حصري: لو سبقنا رفع آخر بنفس الاسم بين الفحص والإنشاء نجرب اسماً آخر
+            open(path, 'xb').close()
+        except FileExistsError:
+            continue
+        return name
+
+
+def start_upload(lesson, field, filename, size, checksum='', user=None):
+    if field not in UPLOAD_DIRS:
+        raise UploadError('نوع الملف غير صالح')
+    if size <= 0:
+        raise UploadError('حجم الملف غير صالح')
+    if size > max_upload_size():
+        raise UploadError('حجم الملف أكبر من الحد المسموح', status=413)
+
+    return Upload.objects.create(
+        lesson=lesson,
+        field=field,
+        filename=filename,
+        path=_reserve(UPLOAD_DIRS[field] + get_valid_filename(os.path.basename(filename))),
+        size=size,
+        checksum=checksum.lower(),
+        created_by=user,
+    )
+
+
+def parse_content_range(header, upload):
+    match = _CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError('Content-Range مطلوب بالصيغة bytes start-end/total')
+    start, end, total = map(int, match.groups())
+    if total != upload.size or end < start or end >= total:
+        raise UploadError('Content-Range غير صالح', status=416)
+    return start, end
+
+
+def _parse_chunk_checksum(header):
+    if not header:
+        return None
+    algorithm, _, value = header.partition(' ')
+    if algorithm.lower() != 'sha256' or not value:
+        raise UploadError('Upload-Checksum مدعوم فقط بالصيغة: sha256 <base64>')
+    return value.strip()
+
+
+def write_chunk(upload, stream, start, end, checksum_header=None):
+    """Copy bytes ``start..end`` from ``stream`` into the upload's file."""
+    if upload.completed:
+        raise UploadError('تم اكتمال هذا الرفع بالفعل', status=409)
+    if start != upload.offset:
+        raise UploadError('الجزء لا يبدأ من آخر موضع محفوظ', status=409)
+
+    expected = _parse_chunk_checksum(checksum_header)
+    digest = hashlib.sha256()
+    remaining = end - start + 1
+    with open(staging_path(upload), 'r+b') as f:
+        f.seek(start)
+        while remaining:
+            data = stream.read(min(COPY_BUFFER, remaining))
+            if not data:
+                break
+            f.write(data)
+            digest.update(data)
+            remaining -= len(data)
+    if remaining:
+        raise UploadError('انقطع الاتصال قبل اكتمال الجزء', status=400)
+    if expected and base64.b64encode(digest.digest()).decode() != expected:
+        raise UploadError('فشل التحقق من سلامة الجزء، أعد إرساله', status=460)
+
+    # compare-and-set حتى لا يتقدم الموضع مرتين لو وصل نفس الجزء مرتين
+    updated = Upload.objects.filter(pk=upload.pk, offset=start).update(offset=end + 1)
+    if not updated:
+        raise UploadError('تم تعديل الرفع من طلب آخر', status=409)
+    upload.offset = end + 1
+    return upload
+
+
+def is_processing(upload):
+    """All bytes are in and ``complete`` has not run yet."""
+    return upload.offset == upload.size and not upload.completed
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete(upload):
+    """Verify the assembled file, move it into media storage and attach it to the lesson."""
+    path = staging_path(upload)
+    checksum = file_sha256(path)
+    if upload.checksum and upload.checksum != checksum:
+        # نعيد الرفع من البداية لأن الملف تالف
+        upload.offset = 0
+        upload.error = 'المجموع الاختباري للملف لا يطابق، أعد رفع الملف'
+        Upload.objects.filter(pk=upload.pk).update(offset=0, error=upload.error)
+        raise UploadError(upload.error, status=460)
+
+    # ننقل الملف إلى اسمه حسب المحتوى (rename إن كان على نفس القرص، أو رفعه مرة
+    # واحدة للتخزين البعيد)؛ لو كان نفس الملف مرفوعاً من قبل نكتفي بالنسخة الموجودة
+    directory, basename = os.path.split(upload.path)
+    final_name = storage.content_name(directory, checksum, os.path.splitext(basename)[1])
+    media = storage.media_storage()
+    if not media.exists(final_name):
+        if storage.is_local():
+            os.makedirs(os.path.dirname(media.path(final_name)), exist_ok=True)
+            shutil.move(path, media.path(final_name))
+        else:
+            with open(path, 'rb') as f:
+                media.store(final_name, File(f))
+    if os.path.exists(path):
+        os.remove(path)
+
+    # حفظ الدرس يحدّث عدد المراجع، والملف القديم يحذفه gc_media إن لم يعد مستخدماً
+    lesson = upload.lesson
+    setattr(lesson, upload.field, final_name)
+    lesson.save(update_fields=[upload.field])
+
+    upload.path = final_name
+    upload.checksum = checksum
+    upload.completed = True
+    upload.error = ''
+    upload.save(update_fields=['path', 'checksum', 'completed', 'offset', 'error', 'updated_at'])
+    return upload
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Stop a regular multipart upload as soon as it exceeds ``max_size``."""
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size
+        self.exceeded = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # الطلب كله أكبر من الحد: نوقف عند أول جزء بدل كتابته في /tmp
+        self.exceeded = bool(content_length and content_length > self.max_size)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.exceeded or start + len(raw_data) > self.max_size:
+            self.exceeded = True
+            # بلا connection_reset: يقرأ Django بقية الطلب ويهمله (دون كتابته) حتى يصل
+            # رد النموذج برسالة الخطأ إلى المتصفح بدل انقطاع الاتصال
+            raise StopUpload(connection_reset=False)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -1,7 +1,7 @@
 from django.urls import path, reverse_lazy
 from django.contrib.auth import views as auth_views
 from .views import after_login_view
-from . import views
+from . import api, views
 from .forms import CustomPasswordResetForm
 
 urlpatterns = [
@@ -9,14 +9,29 @@ urlpatterns = [
     path('dashboard/promote/<int:user_id>/', views.promote_user, name='promote_user'),
     path('dashboard/demote/<int:user_id>/', views.demote_user, name='demote_user'),
     path('dashboard/set_password/<int:user_id>/', views.admin_set_password, name='admin_set_password'),
+    path('dashboard/export/attempts/', views.export_attempts, name='export_attempts'),
+    path('dashboard/export/<int:task_id>/download/', views.export_download, name='export_download'),
+    path('dashboard/gradebook/', views.gradebook, name='gradebook'),
+    path('dashboard/tasks/status/', views.task_status, name='task_status'),
+    path('dashboard/students/import/', views.import_students, name='import_students'),
     path('dashboard/lesson/create/', views.lesson_create, name='lesson_create'),
+    path('dashboard/lesson/<int:lesson_id>/upload/', views.lesson_upload, name='lesson_upload'),
+    path('dashboard/lesson/<int:lesson_id>/uploads/', views.upload_create, name='upload_create'),
+    path('dashboard/uploads/<uuid:upload_id>/', views.upload_detail, name='upload_detail'),
     path('dashboard/lesson/<int:lesson_id>/create_test/', views.test_create_from_lesson, name='test_create_from_lesson'),
     path('dashboard/test/<int:test_id>/add_question/', views.question_add, name='question_add'),
     path('dashboard/test/<int:test_id>/edit/', views.test_edit, name='test_edit'),
+    path('dashboard/test/<int:test_id>/analytics/', views.test_analytics, name='test_analytics'),
+    path('dashboard/test/<int:test_id>/monitor/', views.exam_monitor, name='exam_monitor'),
     # روابط أخرى موجودة عندك سابقًا
     path('', views.home, name='home'),
+    path('search/', views.search, name='search'),
     path('lesson/<int:pk>/', views.lesson_detail, name='lesson_detail'),
+    path('lesson/<int:pk>/pdf/<int:number>/', views.lesson_pdf_page, name='lesson_pdf_page'),
+    path('lesson/<int:pk>/progress/', views.lesson_progress, name='lesson_progress'),
     path('take_test/<int:test_id>/', views.take_test, name='take_test'),
+    path('take_test/<int:test_id>/page/<int:page>/', views.take_test_page, name='take_test_page'),
+    path('take_test/<int:test_id>/draft/', views.save_test_draft, name='save_test_draft'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
     path('register/student/', views.student_register, name='student_register'),
@@ -34,4 +49,16 @@ urlpatterns = [
     path('password_reset/', views.custom_password_reset, name='password_reset'),
     path('password_reset/verify/', views.verify_user_for_reset, name='verify_user_reset'),
     path('password_reset/change/', views.custom_password_reset_confirm, name='password_reset_confirm'),
+
+    # JSON API للتطبيق
+    path('api/v1/auth/csrf/', api.csrf, name='api_csrf'),
+    path('api/v1/auth/login/', api.auth_login, name='api_login'),
+    path('api/v1/auth/logout/', api.auth_logout, name='api_logout'),
+    path('api/v1/me/', api.me, name='api_me'),
+    path('api/v1/lessons/', api.lesson_list, name='api_lessons'),
+    path('api/v1/lessons/<int:pk>/', api.lesson_detail, name='api_lesson'),
+    path('api/v1/tests/', api.test_list, name='api_tests'),
+    path('api/v1/tests/<int:pk>/paper/', api.test_paper, name='api_test_paper'),
+    path('api/v1/tests/<int:pk>/submit/', api.test_submit, name='api_test_submit'),
+    path('api/v1/attempts/<int:pk>/', api.attempt_detail, name='api_attempt'),
 ]
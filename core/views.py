@@ -1,21 +1,26 @@
 # Standard library imports
 import os
 import re
+import json
 import mimetypes
+import tempfile
 
 # Django imports
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib import messages
 from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import AuthenticationForm, PasswordResetForm, SetPasswordForm
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.static import serve
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseForbidden, HttpResponse, JsonResponse
-from django.utils import timezone
-from django.db.models import Count, Sum, Q
+from django.urls import reverse
+from django.http import Http404, HttpResponseForbidden, HttpResponse, JsonResponse, StreamingHttpResponse, FileResponse
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Q, Subquery, Sum
 
 # Local application imports
 from .forms import (
@@ -25,25 +30,29 @@ from .forms import (
     QuestionForm,
     TestForm,
 )
-from .models import Attempt, Lesson, Profile, Question, Test
-
-
-# --- Helper Functions ---
-
-def is_admin(user):
-    """Helper function to check if a user has admin privileges."""
-    if not user.is_authenticated:
-        return False
-    try:
-        # Check custom profile role or Django's built-in staff/superuser flags
-        return user.profile.role == 'admin' or user.is_superuser or user.is_staff
-    except Profile.DoesNotExist:
-        # If profile doesn't exist, rely on staff/superuser status
-        return user.is_superuser or user.is_staff
+from .models import Attempt, Lesson, LessonPage, LessonProgress, Question, QuestionStat, Task, Test, TestStat, Upload
+from .db_routing import stream_on_replica, use_replica
+from .ratelimit import ratelimit
+from .roles import is_admin
+from . import attempts
+from . import events
+from . import exports
+from . import gradebook as gradebook_data
+from . import notifications
+from . import grading
+from . import leaderboard
+from . import papers
+from . import progress
+from . import review
+from . import search as search_index
+from . import storage
+from . import tasks
+from . import uploads
 
 
 # --- Authentication Views ---
 
+@ratelimit('login')
 def user_login(request):
     if request.user.is_authenticated:
         return redirect('home')
@@ -66,6 +75,7 @@ def user_logout(request):
     return redirect('login')
 
 
+@ratelimit('register')
 def student_register(request):
     if request.user.is_authenticated:
         return redirect('home')
@@ -79,17 +89,14 @@ def student_register(request):
             messages.error(request, 'اسم المستخدم موجود بالفعل')
             return redirect('student_register')
 
-        # Create user
-        user = User.objects.create_user(
+        # Create user (the student profile is created by a signal)
+        User.objects.create_user(
             username=username,
             password=password,
             email=email,
             first_name=full_name  # Store full name in first_name field
         )
-        
-        # Create user profile
-        Profile.objects.create(user=user, role='student')
-        
+
         messages.success(request, 'تم إنشاء الحساب بنجاح، يمكنك تسجيل الدخول الآن')
         return redirect('login')
 
@@ -115,6 +122,43 @@ def home(request):
     return render(request, 'home.html', {'lessons': lessons})
 
 
+SEARCH_PAGE_SIZE = 20
+
+
+@login_required
+def search(request):
+    """بحث نصي في الدروس (والأسئلة للأدمن) باستخدام فهرس البحث."""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    results = []
+    has_next = False
+    if query:
+        admin = is_admin(request.user)
+        # نجلب عنصرًا إضافيًا لمعرفة وجود صفحة تالية بدون استعلام COUNT
+        results = search_index.search(
+            query,
+            include_questions=admin,
+            include_hidden=admin,
+            limit=SEARCH_PAGE_SIZE + 1,
+            offset=(page - 1) * SEARCH_PAGE_SIZE,
+        )
+        has_next = len(results) > SEARCH_PAGE_SIZE
+        results = results[:SEARCH_PAGE_SIZE]
+
+    return render(request, 'search.html', {
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': has_next,
+    })
+
+
+@use_replica
 def test_list(request):
     """Display a list of all available tests."""
     if not request.user.is_authenticated:
@@ -126,6 +170,7 @@ def test_list(request):
 
 
 @login_required
+@use_replica
 def user_profile(request):
     """عرض الملف الشخصي للمستخدم مع سجل الاختبارات."""
     # الحصول على محاولات الاختبار للمستخدم مع حساب عدد الأسئلة لكل اختبار في استعلام واحد
@@ -137,7 +182,9 @@ def user_profile(request):
 
     # حساب النسبة المئوية لكل محاولة بشكل منفصل لضمان التحديث
     for attempt in attempts:
-        total_questions = attempt.test.question_set.count()
+        # عدد أسئلة ورقة الطالب (قد يكون أقل من بنك الأسئلة)
+        total_questions = len(attempt.answers) if attempt.answers else attempt.test.question_set.count()
+        attempt.total_questions = total_questions
         if total_questions > 0:
             attempt.score_percentage = round((attempt.score / total_questions) * 100)
         else:
@@ -161,8 +208,16 @@ def user_profile(request):
     if highest_scores:
         average_score = round(sum(highest_scores.values()) / len(highest_scores))
 
-    # حساب إجمالي وقت الدراسة بالدقائق
-    total_study_minutes = 0
+    # الدروس التي أكمل الطالب مشاهدة الفيديو فيها تُحسب مكتملة أيضاً
+    watch = LessonProgress.objects.filter(user=request.user).aggregate(
+        seconds=Sum('watched_seconds'),
+    )
+    completed_lessons.update(
+        LessonProgress.objects.filter(user=request.user, completed=True).values_list('lesson_id', flat=True)
+    )
+
+    # حساب إجمالي وقت الدراسة بالدقائق: وقت المشاهدة الفعلي + مدة الاختبارات
+    total_study_minutes = (watch['seconds'] or 0) / 60
     completed_attempts = attempts.filter(completed=True)
     for attempt in completed_attempts:
         if attempt.test:
@@ -180,12 +235,17 @@ def user_profile(request):
     study_minutes = int(total_study_minutes % 60)
     study_time_formatted = f"{study_hours}h {study_minutes}m"
 
+    recent_attempts = list(attempts[:5])  # عرض آخر 5 محاولات فقط
+    for attempt in recent_attempts:
+        attempt.standing = leaderboard.standing(attempt)
+
     context = {
         'user': request.user,
-        'attempts': attempts[:5],  # عرض آخر 5 محاولات فقط
+        'attempts': recent_attempts,
         'completed_lessons_count': len(completed_lessons),
         'average_score': average_score,
         'study_time': study_time_formatted,
+        'watch_minutes': round((watch['seconds'] or 0) / 60),
         'total_attempts': attempts.count(),
     }
     
@@ -240,6 +300,8 @@ def profile_update(request):
         user.first_name = full_name
         user.email = email
         user.save()
+        if new_password:
+            notifications.notify_password_changed(user)
         
         success_message = 'تم تحديث الملف الشخصي بنجاح' + (' وكلمة المرور' if new_password else '')
         
@@ -304,6 +366,7 @@ def password_change(request):
             # تغيير كلمة المرور
             user.set_password(new_password1)
             user.save()
+            notifications.notify_password_changed(user)
             
             # تحديث الجلسة لتجنب تسجيل الخروج
             update_session_auth_hash(request, user)
@@ -333,57 +396,132 @@ def lesson_detail(request, pk):
         return redirect('home')
     
     test = Test.objects.filter(lesson=lesson).first()
-    return render(request, 'lesson_detail.html', {'lesson': lesson, 'test': test})
+    pdf_page_count = lesson.pdf_pages.count() if lesson.pdf_file else 0
+    lesson_progress = None
+    if lesson.video_file:
+        lesson_progress = LessonProgress.objects.filter(user=request.user, lesson=lesson).first()
+    return render(request, 'lesson_detail.html', {
+        'lesson': lesson,
+        'test': test,
+        'pdf_page_count': pdf_page_count,
+        'progress': lesson_progress,
+        'heartbeat_seconds': progress.HEARTBEAT_SECONDS,
+    })
+
+
+@login_required
+def lesson_pdf_page(request, pk, number):
+    """Redirect to the preview image of one PDF page (loaded one at a time by the viewer)."""
+    lesson = get_object_or_404(Lesson, pk=pk)
+    if lesson.is_hidden and not is_admin(request.user):
+        return HttpResponseForbidden("هذا الدرس غير متاح حاليًا.")
+    page = get_object_or_404(LessonPage, lesson=lesson, number=number)
+    if storage.is_local():
+        return redirect(page.image.url)
+    return redirect(storage.signed_url(page.image.name))
+
+
+@login_required
+def lesson_progress(request, pk):
+    """Heartbeat from the lesson video: buffered, written to the database in batches."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'طلب غير صالح'}, status=405)
+    lesson = get_object_or_404(Lesson, pk=pk)
+    # الدرس المخفي لا يُحسب في تقدم الطلاب ولا في دفتر الدرجات
+    if lesson.is_hidden and not is_admin(request.user):
+        return JsonResponse({'success': False, 'message': 'هذا الدرس غير متاح حاليًا.'}, status=404)
+    try:
+        ranges =json.loads(request.POST.get('ranges') or '[]')
+    except ValueError:
+        ranges = []
+    if not progress.record_heartbeat(
+        request.user.id, lesson.id, request.POST.get('position'), request.POST.get('duration'), ranges,
+    ):
+        return JsonResponse({'success': False, 'message': 'بيانات غير صالحة'}, status=400)
+    return HttpResponse(status=204)
+
+
+def _render_result(request, attempt):
+    return render(request, 'test_result.html', {
+        'attempt': attempt,
+        'standing': leaderboard.standing(attempt),
+        'top': leaderboard.top(attempt.test_id),
+        'distribution': leaderboard.distribution(attempt.test_id),
+    })
 
 
 @login_required
 def take_test(request, test_id):
     test = get_object_or_404(Test, pk=test_id)
-    attempt, created = Attempt.objects.get_or_create(user=request.user, test=test)
+    attempt = attempts.start(request.user, test)
     if attempt.completed:
-        return render(request, 'test_result.html', {'attempt': attempt})
+        return _render_result(request, attempt)
+    # ورقة الطالب (الأسئلة المسحوبة وترتيب الاختيارات) من الكاش حسب البذرة
+    paper = papers.paper_for(attempt, test)
 
-    questions = Question.objects.filter(test=test)
     if request.method == 'POST':
-        score = 0
-        answers_dict = {}  # <-- أضف هذا السطر
-        for q in questions:
-            ans = request.POST.get(str(q.id), '')
-            try:
-                ans_num = int(ans)
-            except Exception:
-                ans_num = 0
-            answers_dict[str(q.id)] = ans_num  # <-- أضف هذا السطر
-            if ans_num == q.correct_answer:
-                score += 1
-        attempt.score = score
-        attempt.completed = True
-        attempt.completed_at = timezone.now()
-        attempt.answers = answers_dict  # <-- أضف هذا السطر
-        # السماح بالمراجعة يكون عكس خيار "منع المراجعة"
-        # إذا كان test.prevent_review = True (منع) => attempt.review_enabled = False (غير مسموح)
-        # إذا كان test.prevent_review = False (عدم منع) => attempt.review_enabled = True (مسموح)
-        attempt.review_enabled = not test.prevent_review
-        attempt.save()
-        return render(request, 'test_result.html', {'attempt': attempt})
-
-    return render(request, 'take_test.html', {'test': test, 'questions': questions})
+        attempts.submit(attempt, test, paper, request.POST, request.user)
+        return _render_result(request, attempt)
+
+    questions, start = papers.get_page(paper, 1, test.page_size)
+    return render(request, 'take_test.html', {
+        'test': test,
+        'questions': questions,
+        'start': start,
+        'answers': attempt.answers or {},
+        'page': 1,
+        'page_count': papers.page_count(paper, test.page_size),
+    })
+
+
+@login_required
+def take_test_page(request, test_id, page):
+    """صفحة واحدة من أسئلة الاختبار (جزء HTML يُحمّل عند التنقل)."""
+    test = get_object_or_404(Test, pk=test_id)
+    attempt = get_object_or_404(Attempt, user=request.user, test=test, completed=False)
+    paper = papers.paper_for(attempt, test)
+    if not 1 <= page <= papers.page_count(paper, test.page_size):
+        raise Http404("Page not found.")
+    questions, start = papers.get_page(paper, page, test.page_size)
+    return render(request, 'take_test_page.html', {
+        'questions': questions,
+        'start': start,
+        'answers': attempt.answers or {},
+    })
+
+
+@login_required
+def save_test_draft(request, test_id):
+    """حفظ إجابات الصفحة الحالية كمسودة في المحاولة قبل الانتقال لصفحة أخرى."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'طلب غير صالح'}, status=405)
+    test = get_object_or_404(Test, pk=test_id)
+    attempt = get_object_or_404(Attempt, user=request.user, test=test, completed=False)
+    paper = papers.paper_for(attempt, test)
+    attempt.answers = papers.collect_answers(paper, request.POST, previous=attempt.answers)
+    attempt.save(update_fields=['answers'])
+    answered = sum(1 for v in attempt.answers.values() if v)
+    return JsonResponse({'success': True, 'answered': answered})
 
 
 @login_required
+@use_replica
 def review_answers(request, attempt_id):
-    attempt = get_object_or_404(Attempt, id=attempt_id, user=request.user)
+    attempt = get_object_or_404(Attempt.objects.select_related('test'), id=attempt_id, user=request.user)
 
     # التحقق مما إذا كانت المراجعة مسموحة لهذا الاختبار
     if attempt.test.prevent_review and not attempt.review_enabled:
         return render(request, 'review_not_allowed.html', status=403)
 
-    questions = Question.objects.filter(test=attempt.test)
-    student_answers = attempt.answers or {}
+    snapshot = attempt.review_snapshot
+    if not review.is_current(snapshot):
+        # محاولات قديمة قبل حفظ اللقطة: نبنيها مرة واحدة من الأسئلة الحالية
+        snapshot = review.legacy_snapshot(attempt, grading.answer_key(attempt.test_id))
+        attempt.review_snapshot = snapshot
+        attempt.save(update_fields=['review_snapshot'])
     return render(request, 'review_answers.html', {
         'attempt': attempt,
-        'questions': questions,
-        'student_answers': student_answers,
+        'questions': review.rows(snapshot),
     })
 
 
@@ -398,32 +536,220 @@ def admin_choice(request):
 
 
 @login_required
+@use_replica
 def admin_dashboard(request):
     if not is_admin(request.user):
         return redirect('home')
 
     # تحسين الأداء: جلب بيانات تقدم جميع المستخدمين في استعلام واحد
-    users_progress = User.objects.filter(is_superuser=False).annotate(
+    # تقدم المشاهدة باستعلامات فرعية حتى لا يتضاعف مجموع الدرجات بسبب الـ JOIN
+    progress_rows = LessonProgress.objects.filter(user=OuterRef('pk')).order_by().values('user')
+    users_progress = User.objects.filter(is_superuser=False).select_related('profile').annotate(
         attempts_count=Count('attempt', filter=Q(attempt__completed=True)),
-        total_score=Sum('attempt__score', filter=Q(attempt__completed=True))
+        total_score=Sum('attempt__score', filter=Q(attempt__completed=True)),
+        lessons_watched=Subquery(
+            progress_rows.filter(completed=True).annotate(n=Count('id')).values('n'),
+            output_field=IntegerField(),
+        ),
+        watch_minutes=Subquery(
+            progress_rows.annotate(total=Sum('watched_seconds') / 60).values('total'),
+            output_field=FloatField(),
+        ),
     ).order_by('username')
 
     lessons = Lesson.objects.all().order_by('-created_at')
     context = {
         'users_progress': users_progress,
         'lessons': lessons,
+        'recent_tasks': Task.objects.order_by('-id')[:10],
+        'monitor_tests': Test.objects.order_by('-id').values('id', 'title'),
     }
     return render(request, 'admin_dashboard.html', context)
 
 
+@login_required
+def import_students(request):
+    """رفع ملف CSV بالطلاب؛ الاستيراد نفسه يتم في مهمة خلفية."""
+    if not is_admin(request.user):
+        return redirect('home')
+    if request.method == 'POST':
+        roster = request.FILES.get('roster')
+        if not roster or not roster.name.lower().endswith('.csv'):
+            messages.error(request, 'يرجى اختيار ملف CSV')
+            return redirect('import_students')
+        # الملف يحتوي كلمات مرور، فلا نحفظه داخل MEDIA_ROOT العام
+        os.makedirs(settings.PRIVATE_UPLOAD_ROOT, exist_ok=True)
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv', dir=settings.PRIVATE_UPLOAD_ROOT, delete=False) as f:
+            for chunk in roster.chunks():
+                f.write(chunk)
+        task = tasks.enqueue(tasks.import_students_file, f.name, max_attempts=1)
+        messages.success(request, f'تمت جدولة استيراد الطلاب (مهمة #{task.pk})، تابع حالتها في لوحة التحكم')
+        return redirect('admin_dashboard')
+    return render(request, 'import_students.html')
+
+
+@login_required
+def exam_monitor(request, test_id):
+    """بث مباشر (SSE) لبدء وتسليم محاولات اختبار، بدل تحديث لوحة التحكم."""
+    if not is_admin(request.user):
+        return HttpResponseForbidden("غير مسموح")
+    test = get_object_or_404(Test, id=test_id)
+    last_event_id = request.headers.get('Last-Event-ID')
+    initial = None
+    if last_event_id is None:
+        # حالة البداية مرة واحدة لكل متابعة؛ عند إعادة الاتصال تكفي الأحداث الفائتة
+        counts = Attempt.objects.filter(test=test).aggregate(
+            started=Count('id'),
+            completed=Count('id', filter=Q(completed=True)),
+        )
+        initial = ('snapshot', {'test': test.title, **counts})
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(
+            events.stream_async(test.id, last_event_id, initial), content_type='text/event-stream',
+        )
+    else:
+        # عامل sync لا يُحجز طوال فتح الصفحة: رد فوري ويعيد المتصفح الاتصال (events.RECONNECT_SECONDS)
+        response = HttpResponse(events.poll_sync(test.id, last_event_id, initial), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: لا تجمّع الأحداث
+    return response
+
+
+@login_required
+def task_status(request):
+    """حالة المهام الخلفية (JSON) لتحديث لوحة التحكم دوريًا."""
+    if not is_admin(request.user):
+        return JsonResponse({'success': False, 'message': 'غير مسموح'}, status=403)
+    ids = [int(i) for i in request.GET.get('ids', '').split(',') if i.isdigit()][:50]
+    rows = Task.objects.filter(id__in=ids).only('id', 'name', 'status', 'attempts', 'last_error')
+    data = []
+    for t in rows:
+        row = {
+            'id': t.id,
+            'name': t.name,
+            'status': t.status,
+            'status_display': t.get_status_display(),
+            'attempts': t.attempts,
+            # آخر سطر من الـ traceback يكفي للعرض
+            'last_error': t.last_error.strip().splitlines()[-1] if t.last_error else '',
+        }
+        if t.name == 'export_attempts_parquet' and t.status == 'done':
+            row['download'] = reverse('export_download', args=[t.id])
+        data.append(row)
+    return JsonResponse({'tasks': data})
+
+
+@login_required
+def test_analytics(request, test_id):
+    """تقرير تحليل الأسئلة لاختبار (يقرأ جداول الإحصائيات فقط)."""
+    if not is_admin(request.user):
+        return redirect('home')
+    test = get_object_or_404(Test, id=test_id)
+    if request.method == 'POST':
+        tasks.enqueue(tasks.rebuild_test_stats, test.id)
+        messages.success(request, 'تمت جدولة إعادة حساب الإحصائيات')
+        return redirect('test_analytics', test_id=test.id)
+
+    test_stat = TestStat.objects.filter(test=test).first()
+    question_stats = (
+        QuestionStat.objects.filter(question__test=test)
+        .select_related('question')
+        .order_by('question_id')
+    )
+    rows = []
+    for stat in question_stats:
+        choices = stat.question.get_choices()
+        answered = stat.responses - stat.unanswered
+        distribution = []
+        for number, text in enumerate(choices, start=1):
+            count = stat.choice_counts.get(str(number), 0)
+            distribution.append({
+                'number': number,
+                'text': text,
+                'count': count,
+                'percent': round(count * 100 / answered) if answered else 0,
+                'is_correct': number == stat.question.correct_answer,
+            })
+        difficulty = stat.difficulty
+        discrimination = stat.discrimination
+        rows.append({
+            'stat': stat,
+            'correct_percent': round(difficulty * 100) if difficulty is not None else None,
+            'discrimination': round(discrimination, 2) if discrimination is not None else None,
+            'distribution': distribution,
+        })
+    return render(request, 'test_analytics.html', {
+        'test': test,
+        'test_stat': test_stat,
+        'rows': rows,
+    })
+
+
+@login_required
+def export_attempts(request):
+    """تصدير المحاولات (CSV متدفق أو Parquet إذا توفرت pyarrow)."""
+    if not is_admin(request.user):
+        return redirect('home')
+    test_id = request.GET.get('test')
+    test_id = int(test_id) if test_id and test_id.isdigit() else None
+    fmt = request.GET.get('format', 'csv')
+    filename = f"attempts_test_{test_id}" if test_id else "attempts"
+
+    if fmt == 'parquet':
+        if not exports.parquet_available():
+            return HttpResponse('تصدير Parquet يتطلب تثبيت مكتبة pyarrow', status=400)
+        # Parquet يكتب الفهرس في نهاية الملف، فلا يمكن بثه؛ يُكتب في الخلفية ويظهر رابط تنزيله في لوحة التحكم
+        task = tasks.enqueue(tasks.export_attempts_parquet, test_id)
+        messages.success(request, f'تمت جدولة التصدير (مهمة #{task.pk})، سيظهر رابط التنزيل في لوحة التحكم عند انتهائه')
+        return redirect('admin_dashboard')
+
+    response = StreamingHttpResponse(exports.iter_csv(test_id=test_id), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+@login_required
+def export_download(request, task_id):
+    """تنزيل ملف تصدير جهزته مهمة خلفية."""
+    if not is_admin(request.user):
+        return redirect('home')
+    task = get_object_or_404(Task, id=task_id, name='export_attempts_parquet', status='done')
+    path = exports.export_path(task.result['file'])
+    if not os.path.exists(path):
+        raise Http404('انتهت صلاحية ملف التصدير، أعد التصدير')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=task.result['filename'])
+
+
+@login_required
+@use_replica
+def gradebook(request):
+    """مصفوفة الدرجات (الطلاب × الاختبارات) أو تنزيلها CSV."""
+    if not is_admin(request.user):
+        return redirect('home')
+    if request.GET.get('format') == 'csv':
+        tests = list(Test.objects.only('id', 'title', 'pool_size').order_by('id'))
+        response = StreamingHttpResponse(
+            stream_on_replica(gradebook_data.iter_csv(tests)), content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="gradebook.csv"'
+        return response
+
+    page = gradebook_data.test_pages().get_page(request.GET.get('page'))
+    tests = list(page)
+    return render(request, 'gradebook.html', {
+        'page': page,
+        'tests': tests,
+        'rows': gradebook_data.iter_html_rows(tests),
+    })
+
+
 @login_required
 def promote_user(request, user_id):
     if not is_admin(request.user):
         return redirect('home')
     target = get_object_or_404(User, id=user_id)
-    profile, created = Profile.objects.get_or_create(user=target)
-    profile.role = 'admin'
-    profile.save()
+    target.profile.role = 'admin'
+    target.profile.save(update_fields=['role'])
     messages.success(request, f'تم ترقية {target.username} إلى أدمن')
     return redirect('admin_dashboard')
 
@@ -433,9 +759,8 @@ def demote_user(request, user_id):
     if not is_admin(request.user):
         return redirect('home')
     target = get_object_or_404(User, id=user_id)
-    profile, created = Profile.objects.get_or_create(user=target)
-    profile.role = 'student'
-    profile.save()
+    target.profile.role = 'student'
+    target.profile.save(update_fields=['role'])
     messages.success(request, f'تم إلغاء صلاحية الأدمن عن {target.username}')
     return redirect('admin_dashboard')
 
@@ -449,6 +774,7 @@ def admin_set_password(request, user_id):
         form = AdminSetPasswordForm(target, request.POST)
         if form.is_valid():
             form.save()
+            notifications.notify_password_changed(target)
             messages.success(request, f'تم تغيير كلمة السر للمستخدم {target.username}')
             return redirect('admin_dashboard')
     else:
@@ -458,13 +784,24 @@ def admin_set_password(request, user_id):
     )
 
 
-@login_required
+@csrf_exempt
 def lesson_create(request):
+    # نضيف معالج حد الحجم قبل قراءة request.POST (لذلك نفحص CSRF بعدها يدويًا)
+    size_limit = uploads.MaxSizeUploadHandler(request, settings.LESSON_FORM_UPLOAD_MAX_SIZE)
+    request.upload_handlers.insert(0, size_limit)
+    return _lesson_create(request, size_limit)
+
+
+@login_required
+@csrf_protect
+def _lesson_create(request, size_limit):
     if not is_admin(request.user):
         return redirect('home')
     if request.method == 'POST':
         form = LessonForm(request.POST, request.FILES)
         add_test = 'add_test' in request.POST
+        if size_limit.exceeded:
+            form.add_error(None, 'حجم الملف أكبر من المسموح في النموذج، احفظ الدرس ثم ارفع الملف من صفحة "رفع ملف كبير"')
         if form.is_valid():
             lesson = form.save()
             if add_test:
@@ -476,6 +813,81 @@ def lesson_create(request):
     return render(request, 'lesson_form.html', {'form': form})
 
 
+@login_required
+def lesson_upload(request, lesson_id):
+    """صفحة رفع فيديو/PDF كبير على أجزاء مع إمكانية الاستكمال."""
+    if not is_admin(request.user):
+        return redirect('home')
+    lesson = get_object_or_404(Lesson, id=lesson_id)
+    return render(request, 'lesson_upload.html', {
+        'lesson': lesson,
+        'max_size': uploads.max_upload_size(),
+    })
+
+
+def _upload_state(upload):
+    return {
+        'id': str(upload.id),
+        'offset': upload.offset,
+        'size': upload.size,
+        'completed': upload.completed,
+        'processing': uploads.is_processing(upload),
+        'error': upload.error,
+        'url': reverse('upload_detail', args=[upload.id]),
+    }
+
+
+@login_required
+def upload_create(request, lesson_id):
+    """بدء رفع على أجزاء: يحجز الملف في مكانه النهائي ويعيد معرف الرفع."""
+    if not is_admin(request.user):
+        return JsonResponse({'success': False, 'message': 'غير مسموح'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'طلب غير صالح'}, status=405)
+    lesson = get_object_or_404(Lesson, id=lesson_id)
+    try:
+        data = json.loads(request.body)
+        upload = uploads.start_upload(
+            lesson,
+            field=data.get('field', ''),
+            filename=data.get('filename', ''),
+            size=int(data.get('size', 0)),
+            checksum=data.get('checksum', ''),
+            user=request.user,
+        )
+    except (ValueError, TypeError):
+        return JsonResponse({'success': False, 'message': 'بيانات غير صالحة'}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=e.status)
+    return JsonResponse({'success': True, **_upload_state(upload)}, status=201)
+
+
+@login_required
+def upload_detail(request, upload_id):
+    """GET/HEAD: الموضع الحالي للاستكمال. PUT: كتابة جزء (Content-Range)."""
+    if not is_admin(request.user):
+        return JsonResponse({'success': False, 'message': 'غير مسموح'}, status=403)
+    upload = get_object_or_404(Upload, id=upload_id)
+
+    if request.method == 'PUT':
+        try:
+            start, end = uploads.parse_content_range(request.headers.get('Content-Range'), upload)
+            uploads.write_chunk(upload, request, start, end, request.headers.get('Upload-Checksum'))
+            if uploads.is_processing(upload):
+                # التحقق من الملف كاملاً ونقله يتم في الخلفية، والصفحة تتابع الحالة
+                tasks.enqueue(tasks.finalize_upload, str(upload.id))
+        except uploads.UploadError as e:
+            response = JsonResponse({'success': False, 'message': str(e), **_upload_state(upload)}, status=e.status)
+            response['Upload-Offset'] = str(upload.offset)
+            return response
+    elif request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'success': False, 'message': 'طلب غير صالح'}, status=405)
+
+    response = JsonResponse({'success': True, **_upload_state(upload)})
+    response['Upload-Offset'] = str(upload.offset)
+    return response
+
+
 @login_required
 def test_create_from_lesson(request, lesson_id):
     if not is_admin(request.user):
@@ -520,6 +932,9 @@ def question_add(request, test_id):
             q = form.save(commit=False)
             q.test = test
             q.save()
+            if q.image:
+                # تصغير الصورة يتم في الخلفية حتى لا ننتظره داخل الطلب
+                tasks.enqueue(tasks.resize_question_image, q.id)
             messages.success(request, 'تم إضافة السؤال')
             return redirect('admin_dashboard')
     else:
@@ -541,7 +956,11 @@ def protected_video(request, lesson_id):
     if not lesson.video_file:
         return HttpResponseForbidden("لا يوجد فيديو لهذا الدرس")
 
-    video_path = os.path.join(settings.MEDIA_ROOT, lesson.video_file.name)
+    if not storage.is_local():
+        # التخزين البعيد يخدم الملف مباشرة عبر رابط موقّع قصير العمر
+        return redirect(storage.signed_url(lesson.video_file.name))
+
+    video_path = lesson.video_file.path
     if not os.path.exists(video_path):
         raise Http404("Video file not found.")
 
@@ -563,7 +982,11 @@ def stream_video(request, lesson_id):
     if not lesson.video_file:
         return HttpResponse("لا يوجد فيديو", status=404)
 
-    video_path = os.path.join(settings.MEDIA_ROOT, lesson.video_file.name)
+    if not storage.is_local():
+        # المتصفح يرسل طلبات Range مباشرة إلى التخزين بعد التحويل
+        return redirect(storage.signed_url(lesson.video_file.name))
+
+    video_path = lesson.video_file.path
     if not os.path.exists(video_path):
         raise Http404("Video file not found.")
 
@@ -596,6 +1019,14 @@ def stream_video(request, lesson_id):
     return resp
 
 
+def serve_media(request, path):
+    """Serve MEDIA_ROOT; content-addressed files never change, so cache them for a year."""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if storage.is_content_addressed(path):
+        response['Cache-Control'] = storage.IMMUTABLE_CACHE_CONTROL
+    return response
+
+
 def custom_404_view(request, exception=None):
     """عرض مخصص لصفحة الخطأ 404"""
     return render(request, '404.html', status=404)
@@ -606,6 +1037,7 @@ def custom_500_view(request):
     return render(request, '500.html', status=500)
 
 
+@ratelimit('password_reset')
 def custom_password_reset(request):
     """Custom password reset view that asks for username and email."""
     if request.method == 'POST':
@@ -636,6 +1068,7 @@ def verify_user_for_reset(request):
     return render(request, 'registration/password_reset_verify.html', {'user': user})
 
 
+@ratelimit('password_reset', key_func=lambda request: request.session.get('reset_user_id'))
 def custom_password_reset_confirm(request):
     """Custom password reset confirmation view."""
     if 'reset_user_id' not in request.session:
@@ -658,6 +1091,7 @@ def custom_password_reset_confirm(request):
         # Set the new password
         user.set_password(password1)
         user.save()
+        notifications.notify_password_changed(user)
         
         # Clear the session
         if 'reset_user_id' in request.session:
@@ -0,0 +1,90 @@
+"""
+Process warm-up before serving requests.
+
+``gunicorn.conf.py`` preloads the app and calls ``run()`` in the master once,
+before any worker is forked, so every worker starts with:
+
+* the project templates already compiled by the cached template loader,
+* the URL resolver populated (all view modules imported),
+* answer keys and shared papers of today's tests in the shared cache.
+
+Workers share those pages with the master copy-on-write instead of each
+building its own on its first requests.  ``run()`` never raises: a missing
+table or an unreachable database only skips the database part.
+"""
+import logging
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Q
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import get_resolver
+from django.utils import timezone
+
+from . import grading, papers
+from .models import Test
+
+logger = logging.getLogger(__name__)
+
+
+def warm_templates():
+    """Compile every template in the project ``templates`` directories."""
+    count = 0
+    for directory in settings.TEMPLATES[0].get('DIRS', []):
+        directory = Path(directory)
+        for path in sorted(directory.rglob('*.html')):
+            name = path.relative_to(directory).as_posix()
+            try:
+                get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                logger.warning('Could not compile template %s', name, exc_info=True)
+                continue
+            count += 1
+    return count
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # reverse_dict يبني جداول الـ URL ويستورد كل ملفات views
+    return len(resolver.reverse_dict)
+
+
+def todays_tests():
+    """Tests with an attempt open or submitted today, or whose lesson was added since yesterday."""
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (
+        Test.objects.filter(
+            Q(attempt__completed=False)
+            | Q(attempt__completed_at__gte=today)
+            | Q(lesson__created_at__gte=today - timedelta(days=1))
+        )
+        .filter(lesson__is_hidden=False)
+        .distinct()
+    )
+
+
+def warm_tests():
+    count = 0
+    for test in todays_tests():
+        grading.answer_key(test.id)
+        if not papers.is_randomized(test):
+            papers.assemble_paper(test, 0)
+        count += 1
+    return count
+
+
+def run():
+    """Warm everything; return ``{step: (count, seconds)}``."""
+    report = {}
+    for step, func in (('templates', warm_templates), ('urls', warm_urls), ('tests', warm_tests)):
+        started = time.monotonic()
+        try:
+            count = func()
+        except Exception:
+            logger.exception('Warm-up step %s failed', step)
+            count = None
+        report[step] = (count, time.monotonic() - started)
+    return report
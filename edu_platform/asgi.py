@@ -0,0 +1,15 @@
+"""
+ASGI entry point.
+
+Needed for the live exam monitor (``/dashboard/test/<id>/monitor/``): under
+ASGI each open Server-Sent Events stream waits on an asyncio queue instead
+of holding a worker thread.  For example::
+
+    uvicorn edu_platform.asgi:application --host 0.0.0.0 --port 8000
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'edu_platform.settings')
+application = get_asgi_application()
@@ -0,0 +1,22 @@
+"""
+Settings profile chosen by ``DJANGO_ENV``: ``dev`` (the default) or ``prod``.
+
+``DJANGO_SETTINGS_MODULE=edu_platform.settings`` keeps working everywhere;
+``edu_platform.settings.prod`` can also be named directly.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from dotenv import load_dotenv
+
+# تحميل المتغيرات البيئية من ملف .env (قبل قراءة DJANGO_ENV)
+load_dotenv()
+
+DJANGO_ENV = os.getenv('DJANGO_ENV', 'dev')
+
+if DJANGO_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif DJANGO_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(f"DJANGO_ENV must be 'dev' or 'prod', not {DJANGO_ENV!r}")
@@ -0,0 +1,203 @@
+"""
+Settings shared by every environment; ``dev.py`` and ``prod.py`` build on
+these and ``__init__.py`` picks one from ``DJANGO_ENV``.
+
+Nothing here may touch the network or print: this module is imported by
+every gunicorn worker and every ``manage.py`` command.
+"""
+from pathlib import Path
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+import os
+
+SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-this-in-production')
+DEBUG = False
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'jazzmin',
+    'core',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'core.db_routing.PinPrimaryMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    #'core.log_ip_middleware.LogIPMiddleware',  # يمكن تفعيله لاحقاً إذا لزم الأمر
+]
+
+ROOT_URLCONF = 'edu_platform.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
+        'APP_DIRS': True,
+        'OPTIONS': {'context_processors': [
+            'django.template.context_processors.debug',
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+            'django.contrib.messages.context_processors.messages',
+        ]},
+    },
+]
+
+WSGI_APPLICATION = 'edu_platform.wsgi.application'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+# قاعدة قراءة فقط (replica) لصفحات التقارير؛ محليًا تكفي نسخة SQLite ثانية
+# تُحدَّث بـ manage.py sync_sqlite_replica
+if os.getenv('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': DATABASES['default']['ENGINE'],
+        'NAME': os.getenv('DATABASE_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db_routing.ReplicaRouter']
+# بعد أي طلب كتابة يبقى المتصفح على القاعدة الرئيسية هذه المدة (بالثواني)
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
+AUTH_PASSWORD_VALIDATORS = [
+    # {
+    #     'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    # },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+        'OPTIONS': {
+            'min_length': 4, # إعادة الطول إلى 4 بناءً على الطلب
+        }
+    },
+    # {
+    #     'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    # },
+    # {
+    #     'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    # },
+]
+
+LANGUAGE_CODE = 'ar'
+TIME_ZONE = 'Africa/Cairo'
+USE_I18N = True
+USE_TZ = True
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# كاش مشترك بين كل عمليات gunicorn/run_workers على نفس الجهاز
+# (الكاش الافتراضي LocMem خاص بكل عملية فتبقى مفاتيح الإجابات القديمة في العمليات الأخرى)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+}
+# محرك الجلسات: db (الافتراضي) أو cached_db (قراءة من الكاش المشترك وكتابة في القاعدة)
+# أو cache (الكاش فقط) أو signed_cookies (بلا تخزين على السيرفر، مناسب لعدة سيرفرات)
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.getenv('SESSION_BACKEND', 'db')]
+SESSION_COOKIE_AGE = int(os.getenv('SESSION_COOKIE_AGE', 60 * 60 * 24 * 14))
+
+# حدود المحاولات (token bucket لكل IP ولكل اسم مستخدم): عدد/ثانية|دقيقة|ساعة
+RATELIMITS = {
+    'login': os.getenv('RATELIMIT_LOGIN', '10/m'),
+    'register': os.getenv('RATELIMIT_REGISTER', '5/m'),
+    'password_reset': os.getenv('RATELIMIT_PASSWORD_RESET', '5/m'),
+}
+# حد لكل عنوان IP: فصل كامل خلف NAT المدرسة يظهر بعنوان واحد، فيكون الحد واسعاً
+RATELIMITS_PER_IP = {
+    'login': os.getenv('RATELIMIT_LOGIN_PER_IP', '600/m'),
+    'register': os.getenv('RATELIMIT_REGISTER_PER_IP', '300/m'),
+    'password_reset': os.getenv('RATELIMIT_PASSWORD_RESET_PER_IP', '100/m'),
+}
+# فعّله فقط خلف بروكسي يضيف X-Forwarded-For (وإلا يستطيع العميل تزويره)
+RATELIMIT_TRUST_X_FORWARDED_FOR = os.getenv('RATELIMIT_TRUST_X_FORWARDED_FOR', '0') == '1'
+
+LOGIN_URL = '/login/'
+LOGIN_REDIRECT_URL = '/after_login/'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# ملفات مرفوعة لا يجب أن تُخدم للعامة (مثل قوائم الطلاب بكلمات المرور)
+PRIVATE_UPLOAD_ROOT = os.getenv('PRIVATE_UPLOAD_ROOT', os.path.join(BASE_DIR, 'private_uploads'))
+
+# حدود رفع ملفات الدروس (بالبايت)
+# الرفع العادي من نموذج الدرس يتوقف بعد هذا الحجم، والملفات الأكبر تُرفع على أجزاء
+LESSON_FORM_UPLOAD_MAX_SIZE = int(os.getenv('LESSON_FORM_UPLOAD_MAX_SIZE', 100 * 1024 * 1024))
+LESSON_UPLOAD_MAX_SIZE = int(os.getenv('LESSON_UPLOAD_MAX_SIZE', 8 * 1024 ** 3))
+
+# تخزين ملفات الدروس والأسئلة: 'local' (MEDIA_ROOT) أو 's3' (أي خدمة متوافقة مع S3 مثل MinIO)
+# وضع s3 يحتاج: pip install django-storages boto3
+MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'local')
+AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME', '')
+AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL') or None  # مثال MinIO: http://127.0.0.1:9000
+AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME') or None
+AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
+AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
+AWS_S3_ADDRESSING_STYLE = os.getenv('AWS_S3_ADDRESSING_STYLE', 'path')
+AWS_DEFAULT_ACL = None
+AWS_QUERYSTRING_AUTH = True  # روابط موقّعة فقط، الـ bucket نفسه يبقى خاصاً
+AWS_QUERYSTRING_EXPIRE = int(os.getenv('AWS_QUERYSTRING_EXPIRE', 60 * 60))
+# مدة روابط الفيديو وملفات PDF الموقّعة التي تصدرها صفحات الدروس (بالثواني)
+MEDIA_SIGNED_URL_EXPIRE = int(os.getenv('MEDIA_SIGNED_URL_EXPIRE', 5 * 60))
+
+# تقدم مشاهدة الفيديو: تُجمع النبضات في الذاكرة وتُكتب دفعة واحدة
+PROGRESS_FLUSH_SECONDS = int(os.getenv('PROGRESS_FLUSH_SECONDS', 10))
+PROGRESS_FLUSH_SIZE = int(os.getenv('PROGRESS_FLUSH_SIZE', 200))
+LESSON_COMPLETE_PERCENT = int(os.getenv('LESSON_COMPLETE_PERCENT', 90))
+
+JAZZMIN_SETTINGS = {
+    "site_title": "لوحة إدارة المنصة",
+    "site_header": "إدارة المنصة",
+    "site_brand": "منصة تعليمية",
+    "welcome_sign": "مرحباً بك في لوحة الإدارة",
+    "primary_color": "#25d366",  # لون رئيسي مثل واتساب
+    "secondary_color": "#075e54",
+    "show_sidebar": True,
+    "navigation_expanded": True,
+    "custom_css": "static/style.css",  # يمكنك ربط CSS خاص بك
+    # ...إعدادات أخرى كثيرة...
+}
+
+# Email Configuration
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@example.com')
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 10))
+# الإشعارات تُرسل من طابور OutboundEmail (core/notifications.py) على دفعات عبر اتصال واحد
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 50))
+EMAIL_RATE_PER_MINUTE = int(os.getenv('EMAIL_RATE_PER_MINUTE', 300))  # حد مزود SMTP
+
+# Password Reset Settings
+PASSWORD_RESET_TIMEOUT = 86400  # 24 hours in seconds
+
+# Frontend URL for password reset links (used in emails)
+FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:8000')
+
@@ -0,0 +1,31 @@
+"""Local development: DEBUG on, any host, address banner for runserver."""
+import os
+import sys
+
+from .base import *  # noqa: F401,F403
+
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
+
+# إعدادات الشبكة
+if DEBUG:
+    # السماح بالوصول من أي عنوان IP
+    ALLOWED_HOSTS = ['*']
+
+# العنوان يُطبع مرة واحدة عند تشغيل runserver فقط (عملية المراقبة لا تطبعه)،
+# وليس مع كل أمر manage.py
+if DEBUG and 'runserver' in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+    import socket
+
+    try:
+        # الحصول على عنوان IP المحلي
+        hostname = socket.gethostname()
+        local_ip = socket.gethostbyname(hostname)
+
+        print("\n" + "="*60)
+        print(f"📌 للوصول المحلي: http://{local_ip}:8000")
+        print(f"🌍 للوصول من الأجهزة الأخرى على نفس الشبكة")
+        print("="*60 + "\n")
+
+    except Exception as e:
+        print(f"\n⚠️ تحذير: {str(e)}")
+        print("📌 الموقع يعمل على العنوان: http://localhost:8000\n")
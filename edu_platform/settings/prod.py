@@ -0,0 +1,41 @@
+"""
+Production: DEBUG off, compiled templates kept in memory, compressed pages
+and persistent database connections.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import MIDDLEWARE, TEMPLATES
+
+DEBUG = False
+
+if SECRET_KEY == 'dev-secret-key-change-this-in-production':  # noqa: F405
+    raise ImproperlyConfigured('Set SECRET_KEY in the environment for DJANGO_ENV=prod')
+
+# القوالب تُقرأ وتُحلل مرة واحدة لكل عملية
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+# ضغط صفحات HTML/JSON فقط (الفيديو والبث المباشر والتصدير تمر كما هي)
+MIDDLEWARE = MIDDLEWARE[:1] + ['core.compression.PageGZipMiddleware'] + MIDDLEWARE[1:]
+
+# اتصال قاعدة البيانات يبقى مفتوحاً بين الطلبات بدل فتحه مع كل طلب
+for _db in DATABASES.values():  # noqa: F405
+    _db['CONN_MAX_AGE'] = int(os.getenv('CONN_MAX_AGE', 60))
+    _db['CONN_HEALTH_CHECKS'] = True
+
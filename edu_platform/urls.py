@@ -5,19 +5,24 @@ from django.conf.urls.static import static
 from django.views.static import serve
 from django.urls import re_path
 
+from core.views import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('core.urls')),
 ]
 
-# خدمة الملفات الثابتة والوسائط في وضع التطوير
+# الوسائط: الملفات المسماة ببصمتها تُخزَّن مؤقتاً في المتصفح بلا انتهاء
+urlpatterns += [
+    re_path(r'^media/(?P<path>.*)$', serve_media),
+]
+
+# خدمة الملفات الثابتة في وضع التطوير
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 else:
     # إعدادات الإنتاج لخدمة الملفات الثابتة
     urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
         re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
     ]
 
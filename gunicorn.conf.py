@@ -0,0 +1,51 @@
+"""
+Gunicorn settings (picked up automatically from the working directory).
+
+The app is imported once in the master (``preload_app``) and warmed up
+there (``core.warmup``) before the workers are forked, so workers share the
+imported modules and compiled templates copy-on-write and the first
+requests after a deploy are not the slow ones.
+
+Database connections must never cross a fork: the master closes every
+connection it opened during warm-up, and each worker drops any connection
+object it inherited before handling its first request.
+"""
+import multiprocessing
+import os
+
+# أمر web في Procfile هو تشغيل الإنتاج: DEBUG مغلق ما لم يُحدد DJANGO_ENV صراحةً
+raw_env = [f"DJANGO_ENV={os.getenv('DJANGO_ENV') or 'prod'}"]
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+# إعادة تشغيل العامل بعد عدد من الطلبات تحد من تضخم الذاكرة، والتفاوت يمنع إعادة تشغيلهم معاً
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+
+def when_ready(server):
+    # يعمل في العملية الرئيسية بعد تحميل التطبيق وقبل إنشاء العمال
+    if not preload_app:
+        return
+    from django.db import connections
+
+    from core import warmup
+
+    try:
+        report = warmup.run()
+    finally:
+        connections.close_all()
+    for step, (count, seconds) in report.items():
+        server.log.info('Warm-up %s: %s in %.2fs', step, count, seconds)
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from django.db import connections
+
+    # أي اتصال موروث من العملية الرئيسية يخصها؛ نتركه دون إغلاق ونفتح اتصالاً جديداً
+    for conn in connections.all(initialized_only=True):
+        conn.connection = None